@@ -1,6 +1,8 @@
 from langchain_community.vectorstores import DeepLake
-from repogpt.crawler import crawl_and_split, index
+from repogpt.crawler import embed_chunk_store, index_repos, update_chunk_store, update_index, update_sharded_index
+from repogpt.run_report import RunReport
 from repogpt.qa.qa import QA
+from repogpt.qa.sharded_retriever import ShardedDeepLake
 from repogpt import config_utils
 import argparse
 import logging
@@ -15,31 +17,113 @@ init(autoreset=True)
 def parse_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("--init", "-I", action='store_true', help='Use this flag to crawl and index repository')
-    parser.add_argument('config_file', help='Path to the config file')
+    parser.add_argument("--update", "-U", action='store_true',
+                        help='Use this flag to re-index only the files git reports as changed since the last index')
+    parser.add_argument("--resume", "-R", action='store_true',
+                        help='Use this flag to continue an interrupted index run from its last committed batch')
+    parser.add_argument("--chunk", "-C", action='store_true',
+                        help='Use this flag to crawl and chunk the repository into the chunk store without embedding')
+    parser.add_argument("--embed", "-E", action='store_true',
+                        help='Use this flag to embed the chunk store into the vector store without crawling')
+    parser.add_argument("--report", help='Path to write a JSON report of where the indexing run spent its time')
+    parser.add_argument('config_files', nargs='+', metavar='config_file',
+                        help='Path to the config file. Several config files can be given with --init, --update or '
+                             '--resume to index several repos in one run. They must all use the same embeddings, the '
+                             'first one sets the embedding scheduler and number of workers shared by all of them')
     return parser.parse_args()
 
 
+def read_repo_options(config_file: str) -> dict:
+    """Get the update_index arguments of the repo described by a config file, without the shared worker count"""
+    repo_path, vs_path, _, _, _ = config_utils.read_config_dir_paths(config_file)
+    chunk_settings = config_utils.read_config_chunk_settings(config_file)
+    crawler_options = config_utils.read_config_crawler_options(config_file)
+    del crawler_options["workers"]
+    return dict(root_dir=repo_path, vs_path=vs_path, chunk_settings=chunk_settings, **crawler_options)
+
+
 def main():
     args = parse_arguments()
-
-    # create embedding object - required for both indexing and qa
-    embeddings = config_utils.read_config_embeddings(args.config_file)
+    args.config_file = args.config_files[0]
+    multi_repo = len(args.config_files) > 1
+    if multi_repo and (args.chunk or args.embed or not (args.init or args.update or args.resume)):
+        raise ValueError("Several config files can only be given with --init, --update or --resume!")
 
     # get paths to repository to crawl, vector store and num results to extract from vector store per query
-    repo_path, vs_path, num_results, chunk_size, chunk_overlap = config_utils.read_config_dir_paths(args.config_file)
+    repo_path, vs_path, num_results, _, _ = config_utils.read_config_dir_paths(args.config_file)
+    chunk_settings = config_utils.read_config_chunk_settings(args.config_file)
+    crawler_options = config_utils.read_config_crawler_options(args.config_file)
+    shard_options = config_utils.read_config_shard_options(args.config_file)
+
+    # chunk and embed in separate steps through the chunk store
+    if args.chunk or args.embed:
+        if shard_options["shard_by"] != "none":
+            raise ValueError("Sharded indexes cannot be embedded from the chunk store, use --init instead!")
+        store_path = config_utils.read_config_chunk_store_path(args.config_file, vs_path)
+        run_report = RunReport()
+        try:
+            if args.chunk:
+                logger.info("Crawling repo...")
+                chunk_options = {key: value for key, value in crawler_options.items() if key != "batch_size"}
+                update_chunk_store(repo_path, store_path, chunk_settings=chunk_settings, use_git=args.update,
+                                   run_report=run_report, **chunk_options)
+            if args.embed:
+                logger.info("Embedding chunk store...")
+                # only created here, so chunking needs neither embedding credentials nor the model
+                embeddings = config_utils.read_config_embeddings(args.config_file)
+                scheduler = config_utils.read_config_embedding_scheduler(args.config_file, embeddings)
+                embed_chunk_store(store_path, embeddings, vs_path, crawler_options["batch_size"], scheduler,
+                                  resume=args.resume, run_report=run_report)
+        finally:
+            if args.report:
+                run_report.save(args.report)
 
     # if running in init mode, just crawl and index the repo
-    if args.init:
+    elif args.init or args.update or args.resume:
         logger.info("Crawling repo...")
-        repo_docs = crawl_and_split(repo_path, chunk_size, chunk_overlap)
-        index(repo_docs, embeddings, vs_path)
-        logging.info(f"chunks successfully indexed to vector store located at {repo_path}")
+        embeddings = config_utils.read_config_embeddings(args.config_file)
+        scheduler = config_utils.read_config_embedding_scheduler(args.config_file, embeddings)
+        run_report = RunReport()
+        try:
+            if multi_repo:
+                # one pool, scheduler and set of grammars for all repos, each repo gets its own vector store
+                if any(config_utils.read_config_shard_options(config_file)["shard_by"] != "none"
+                       for config_file in args.config_files):
+                    raise ValueError("Sharded indexes must be indexed one config file at a time!")
+                # every repo is embedded with the embeddings of the first config file
+                embedding_options = config_utils.read_config_embedding_options(args.config_file)
+                if any(config_utils.read_config_embedding_options(config_file) != embedding_options
+                       for config_file in args.config_files[1:]):
+                    raise ValueError("Config files indexed in one run must all use the same embeddings!")
+                repos = [read_repo_options(config_file) for config_file in args.config_files]
+                failed = index_repos(repos, embeddings, crawler_options["workers"], use_git=args.update,
+                                     scheduler=scheduler, resume=args.resume, run_report=run_report)
+                if failed:
+                    logger.error(f"Failed to index {len(failed)} repos: {', '.join(failed)}")
+            elif shard_options["shard_by"] != "none":
+                # every shard is compared against its own manifest after a single listing of the repo
+                failed = update_sharded_index(repo_path, embeddings, vs_path, chunk_settings=chunk_settings,
+                                              scheduler=scheduler, resume=args.resume, run_report=run_report,
+                                              **shard_options, **crawler_options)
+                if failed:
+                    logger.error(f"Failed to index {len(failed)} shards: {', '.join(failed)}")
+            else:
+                update_index(repo_path, embeddings, vs_path, chunk_settings=chunk_settings, use_git=args.update,
+                             scheduler=scheduler, resume=args.resume, run_report=run_report, **crawler_options)
+        finally:
+            if args.report:
+                run_report.save(args.report)
+        if not multi_repo:
+            logging.info(f"chunks successfully indexed to vector store located at {repo_path}")
 
     # running in qa mode
     else:
         logger.info("Initializing LLM...")
         llm = config_utils.read_config_llm(args.config_file)
-        vs = DeepLake(dataset_path=vs_path, read_only=True, embedding=embeddings)
+        embeddings = config_utils.read_config_embeddings(args.config_file)
+        # a sharded index is searched across all of its shards at once
+        vs = ShardedDeepLake.open(vs_path, embeddings, shard_options["shard_workers"]) or \
+            DeepLake(dataset_path=vs_path, read_only=True, embedding=embeddings)
         qa = QA(llm, vs, num_results)
 
         while True:
@@ -0,0 +1,111 @@
+from repogpt.manifest import FileRecord, Manifest
+from typing import Dict, List, Optional
+import json
+import os
+
+
+def checkpoint_path(vs_path: str) -> str:
+    """Location of the checkpoint journal that sits next to the vector store"""
+    return f"{vs_path.rstrip(os.sep)}.checkpoint.jsonl"
+
+
+class IndexCheckpoint:
+    """Append-only journal of an indexing run. The first line holds the plan of the run: the manifest records it is
+    going to end up with and the files it still has to index. Every batch then writes the ids of its chunks before they
+    are added to the vector store, and the records of its files once they are committed. Chunks of a batch that was
+    begun but never committed may be in the store and have to be deleted before the batch is indexed again"""
+
+    def __init__(
+            self,
+            path: str,
+            settings: dict,
+            commit_sha: Optional[str],
+            records: Dict[str, FileRecord],
+            files_to_index: List[str],
+            dirty_paths: Optional[List[str]] = None
+    ):
+        self.path = path
+        self.settings = settings
+        self.commit_sha = commit_sha
+        self.records = records
+        self.files_to_index = files_to_index
+        self.dirty_paths = dirty_paths or []
+        self.committed = {}
+        self.uncommitted_ids = []
+
+    @staticmethod
+    def load(path: str) -> Optional['IndexCheckpoint']:
+        """Load the checkpoint of an interrupted run, returns None if there is none"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            lines = f.readlines()
+        if not lines:
+            return None
+
+        header = json.loads(lines[0])
+        checkpoint = IndexCheckpoint(path, header["settings"], header["commit_sha"],
+                                     {file_path: FileRecord.from_dict(record)
+                                      for file_path, record in header["files"].items()},
+                                     header["files_to_index"], header.get("dirty_paths"))
+        for line in lines[1:]:
+            try:
+                batch = json.loads(line)
+            except json.JSONDecodeError:
+                # the run died while writing this line so the batch was never marked as committed
+                break
+            if "begin" in batch:
+                checkpoint.uncommitted_ids.extend(batch["begin"])
+            else:
+                checkpoint.committed.update({file_path: FileRecord.from_dict(record)
+                                             for file_path, record in batch["files"].items()})
+                checkpoint.uncommitted_ids = []
+        return checkpoint
+
+    def start(self):
+        """Write the plan of the run, replacing any previous checkpoint"""
+        header = {
+            "settings": self.settings,
+            "commit_sha": self.commit_sha,
+            "files": {file_path: record.to_dict() for file_path, record in self.records.items()},
+            "files_to_index": self.files_to_index,
+            "dirty_paths": self.dirty_paths
+        }
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append(self, line: dict):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(line) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, records: Dict[str, FileRecord]):
+        """Record the ids of the chunks of these files before they are written to the vector store"""
+        chunk_ids = [chunk_id for record in records.values() for chunk_id in record.chunk_ids]
+        self._append({"begin": chunk_ids})
+        self.uncommitted_ids.extend(chunk_ids)
+
+    def commit(self, records: Dict[str, FileRecord]):
+        """Record that the chunks of these files are in the vector store"""
+        self._append({"files": {file_path: record.to_dict() for file_path, record in records.items()}})
+        self.committed.update(records)
+        self.uncommitted_ids = []
+
+    def pending_files(self) -> List[str]:
+        """Files of the plan that have not been committed yet, in their original order"""
+        return [file_path for file_path in self.files_to_index if file_path not in self.committed]
+
+    def to_manifest(self) -> Manifest:
+        """Manifest describing what is actually in the vector store: pending files are left out so they count as new.
+        The commit is left out too, git cannot tell which files are still pending"""
+        pending = set(self.pending_files())
+        records = {file_path: record for file_path, record in self.records.items() if file_path not in pending}
+        records.update(self.committed)
+        return Manifest(records, self.settings)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
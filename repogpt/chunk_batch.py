@@ -0,0 +1,95 @@
+from langchain.docstore.document import Document
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+# integer metadata of every chunk, each stored in its own column
+INT_COLUMNS = ("start_index", "end_index", "starting_line", "ending_line", "code_start", "code_end", "num_tokens")
+
+
+class ChunkBatch:
+    """Columnar batch of chunks. Integer metadata lives in typed arrays, source paths are interned and stored once per
+    batch and each chunk only holds an index into them. Documents are only built when a batch is handed to langchain"""
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.path_ids = array('l')
+        self.texts: List[str] = []
+        self.contexts: List[dict] = []
+        self.columns: Dict[str, array] = {column: array('q') for column in INT_COLUMNS}
+        self._path_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_path_index']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._path_index = {path: path_id for path_id, path in enumerate(self.paths)}
+
+    def intern_path(self, path: str) -> int:
+        path_id = self._path_index.get(path)
+        if path_id is None:
+            path_id = self._path_index[path] = len(self.paths)
+            self.paths.append(path)
+        return path_id
+
+    def append(self, text: str, metadata: dict):
+        self.path_ids.append(self.intern_path(metadata['source']))
+        self.texts.append(text)
+        self.contexts.append(metadata.get('context', {}))
+        for column in INT_COLUMNS:
+            self.columns[column].append(metadata.get(column, -1))
+
+    def extend(self, other: 'ChunkBatch'):
+        """Append the chunks of another batch, re-mapping its interned paths"""
+        path_ids = [self.intern_path(path) for path in other.paths]
+        self.path_ids.extend(path_ids[path_id] for path_id in other.path_ids)
+        self.texts.extend(other.texts)
+        self.contexts.extend(other.contexts)
+        for column in INT_COLUMNS:
+            self.columns[column].extend(other.columns[column])
+
+    @staticmethod
+    def from_documents(docs: Iterable[Document]) -> 'ChunkBatch':
+        batch = ChunkBatch()
+        for doc in docs:
+            batch.append(doc.page_content, doc.metadata)
+        return batch
+
+    @staticmethod
+    def concat(batches: Iterable['ChunkBatch']) -> 'ChunkBatch':
+        combined = ChunkBatch()
+        for batch in batches:
+            combined.extend(batch)
+        return combined
+
+    def source(self, i: int) -> str:
+        return self.paths[self.path_ids[i]]
+
+    def ids(self) -> List[str]:
+        """Deterministic ids of the chunks in the vector store"""
+        start_indexes = self.columns['start_index']
+        return [f"{self.source(i)}:{start_indexes[i]}" for i in range(len(self))]
+
+    def metadata(self, i: int) -> dict:
+        metadata = {'source': self.source(i)}
+        for column in INT_COLUMNS:
+            value = self.columns[column][i]
+            if value != -1:
+                metadata[column] = value
+        metadata['context'] = self.contexts[i]
+        return metadata
+
+    def metadatas(self) -> List[dict]:
+        return [self.metadata(i) for i in range(len(self))]
+
+    def iter_documents(self) -> Iterator[Document]:
+        for i in range(len(self)):
+            yield Document(page_content=self.texts[i], metadata=self.metadata(i))
+
+    def to_documents(self) -> List[Document]:
+        return list(self.iter_documents())
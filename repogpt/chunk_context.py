@@ -0,0 +1,66 @@
+from repogpt.parsers.treesitter import TreeSitterParser, FileSummary, SummaryPosition
+from typing import List, Tuple
+
+EMBED_HEADERS = ("full", "short", "none")
+FULL_HEADER_FOOTER = "\n``` "
+
+
+def compact_positions(positions: List[SummaryPosition]) -> List[list]:
+    return [[pos.name, pos.start_line, pos.end_line] for pos in positions]
+
+
+def snippet_context(file_summary: FileSummary, start_line: int, end_line: int) -> dict:
+    """Compact metadata of the classes and methods a snippet belongs to: the last ones starting before it that are still
+    open at its start and the ones defined inside it"""
+    context = {}
+    for key, positions in (("classes", file_summary.classes), ("methods", file_summary.methods)):
+        last_obj, current_obj = TreeSitterParser.get_summary_from_position(positions, start_line, end_line)
+        context[key] = compact_positions(last_obj[-1:] + current_obj)
+    return context
+
+
+def describe_context(context: dict, start_line: int, end_line: int) -> str:
+    """English description of the classes and methods in a snippet's context, as used in prompts"""
+    file_summary = FileSummary()
+    for name, class_start_line, class_end_line in context.get("classes", []):
+        file_summary.add_class(name, class_start_line, class_end_line)
+    for name, method_start_line, method_end_line in context.get("methods", []):
+        file_summary.add_method(name, method_start_line, method_end_line)
+    return TreeSitterParser.get_closest_method_class_in_snippet(file_summary, start_line, end_line)
+
+
+def render_full_header(path: str, start_line: int, end_line: int, context: dict) -> str:
+    return f"The following code snippet is from a file at location " \
+           f"{path} " \
+           f"starting at line {start_line} and ending at line {end_line}. " \
+           f"{describe_context(context, start_line, end_line)} " \
+           f"The code snippet starting at line {start_line} and ending at line " \
+           f"{end_line} is \n ```\n"
+
+
+def render_short_header(path: str, start_line: int, end_line: int, context: dict) -> str:
+    names = [name for name, _, _ in context.get("classes", []) + context.get("methods", [])]
+    scope = f" ({', '.join(names)})" if names else ""
+    return f"{path} lines {start_line}-{end_line}{scope}\n"
+
+
+def render_header(embed_header: str, path: str, start_line: int, end_line: int, context: dict) -> Tuple[str, str]:
+    """Header and footer embedded around a chunk's code"""
+    if embed_header == "full":
+        return render_full_header(path, start_line, end_line, context), FULL_HEADER_FOOTER
+    elif embed_header == "short":
+        return render_short_header(path, start_line, end_line, context), ""
+    elif embed_header == "none":
+        return "", ""
+    raise ValueError(f"Unknown embed header {embed_header}, must be one of {', '.join(EMBED_HEADERS)}!")
+
+
+def render_chunk(page_content: str, metadata: dict) -> str:
+    """Render a chunk for a prompt with its full context header built from its metadata. Chunks indexed before the
+    context was kept in metadata already have the full header inlined and are returned as they are"""
+    if "code_start" not in metadata:
+        return page_content
+    code = page_content[metadata["code_start"]:metadata["code_end"]]
+    start_line, end_line = metadata["starting_line"], metadata["ending_line"]
+    return f"{render_full_header(metadata['source'], start_line, end_line, metadata.get('context', {}))}" \
+           f"{code}{FULL_HEADER_FOOTER}"
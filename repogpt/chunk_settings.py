@@ -0,0 +1,35 @@
+from repogpt.chunk_context import EMBED_HEADERS
+
+CHUNKINGS = ("character", "syntax")
+CHUNK_UNITS = ("characters", "tokens")
+
+
+class ChunkSettings:
+    """How files are split into chunks. chunk_size and chunk_overlap are measured in chunk_unit, either characters or
+    tokens. With syntax chunking, chunks follow the class and method boundaries found by the file's parser. embed_header
+    picks the context header embedded with each chunk. An index has to be rebuilt when any of these change"""
+
+    def __init__(
+            self,
+            chunk_size: int = 3000,
+            chunk_overlap: int = 0,
+            chunking: str = "character",
+            chunk_unit: str = "characters",
+            embed_header: str = "short"
+    ):
+        if chunking not in CHUNKINGS:
+            raise ValueError(f"Unknown chunking {chunking}, must be either character or syntax!")
+        if chunk_unit not in CHUNK_UNITS:
+            raise ValueError(f"Unknown chunk unit {chunk_unit}, must be either characters or tokens!")
+        if embed_header not in EMBED_HEADERS:
+            raise ValueError(f"Unknown embed header {embed_header}, must be one of {', '.join(EMBED_HEADERS)}!")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunking = chunking
+        self.chunk_unit = chunk_unit
+        self.embed_header = embed_header
+
+    def to_dict(self) -> dict:
+        """Settings recorded in manifests, checkpoints and chunk stores to tell whether an index is still valid"""
+        return {"chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap, "chunking": self.chunking,
+                "chunk_unit": self.chunk_unit, "embed_header": self.embed_header}
@@ -0,0 +1,202 @@
+from repogpt.chunk_batch import ChunkBatch, INT_COLUMNS
+from repogpt.manifest import FileRecord
+from array import array
+from typing import Dict, List, Optional
+import json
+import mmap
+import os
+import shutil
+
+CHUNK_STORE_VERSION = 1
+
+
+def chunk_store_path(vs_path: str) -> str:
+    """Default location of the chunk store that sits next to the vector store"""
+    return f"{vs_path.rstrip(os.sep)}.chunks"
+
+
+def map_file(file_path: str) -> Optional[mmap.mmap]:
+    """Memory-map a file read-only, returns None for empty files which cannot be mapped"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class StoredFile:
+    """A file in the chunk store: its record and the range of its chunks"""
+
+    def __init__(self, size: int, mtime_ns: int, content_hash: str, start: int, end: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "hash": self.content_hash, "start": self.start,
+                "end": self.end}
+
+    @staticmethod
+    def from_dict(stored_file: dict) -> 'StoredFile':
+        return StoredFile(stored_file["size"], stored_file["mtime_ns"], stored_file["hash"], stored_file["start"],
+                          stored_file["end"])
+
+
+class ChunkStore:
+    """Read-only view of the chunks of a repo persisted by ChunkStoreWriter. Texts, contexts and integer metadata are
+    kept in flat files that are memory-mapped, so reading the chunks of a file only touches the pages it needs"""
+
+    def __init__(
+            self,
+            path: str,
+            settings: dict,
+            commit_sha: Optional[str],
+            files: Dict[str, StoredFile],
+            dirty_paths: Optional[List[str]] = None
+    ):
+        self.path = path
+        self.settings = settings
+        self.commit_sha = commit_sha
+        self.dirty_paths = dirty_paths or []
+        self.files = files
+        self.maps = []
+        self.texts = self._view('texts.bin')
+        self.text_offsets = self._view('texts.idx').cast('q')
+        self.contexts = self._view('contexts.bin')
+        self.context_offsets = self._view('contexts.idx').cast('q')
+        self.columns = {column: self._view(f'{column}.bin') for column in INT_COLUMNS}
+
+    def _view(self, file_name: str) -> memoryview:
+        mapped = map_file(os.path.join(self.path, file_name))
+        if mapped is None:
+            return memoryview(b'')
+        self.maps.append(mapped)
+        return memoryview(mapped)
+
+    @staticmethod
+    def open(path: str) -> Optional['ChunkStore']:
+        """Open a chunk store, returns None if there is none or it was written by another version"""
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("version") != CHUNK_STORE_VERSION:
+            return None
+        return ChunkStore(path, meta["settings"], meta.get("commit_sha"),
+                          {file_path: StoredFile.from_dict(stored_file)
+                           for file_path, stored_file in meta["files"].items()}, meta.get("dirty_paths"))
+
+    def __len__(self) -> int:
+        return max(len(self.text_offsets) - 1, 0)
+
+    def close(self):
+        """Release the memory maps, the store must be closed before it is replaced on windows"""
+        for view in [self.texts, self.text_offsets, self.contexts, self.context_offsets, *self.columns.values()]:
+            view.release()
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+    def file_chunks(self, file_path: str) -> ChunkBatch:
+        """The chunks of one file, in order"""
+        stored_file = self.files[file_path]
+        start, end = stored_file.start, stored_file.end
+
+        batch = ChunkBatch()
+        path_id = batch.intern_path(file_path)
+        batch.path_ids.extend([path_id] * (end - start))
+        for i in range(start, end):
+            batch.texts.append(bytes(self.texts[self.text_offsets[i]:self.text_offsets[i + 1]]).decode('utf-8'))
+            batch.contexts.append(json.loads(bytes(
+                self.contexts[self.context_offsets[i]:self.context_offsets[i + 1]])))
+        for column in INT_COLUMNS:
+            batch.columns[column].frombytes(self.columns[column][start * 8:end * 8])
+        return batch
+
+    def records(self) -> Dict[str, FileRecord]:
+        """Manifest records of the stored files with the ids of their chunks"""
+        start_indexes = self.columns['start_index'].cast('q')
+        return {file_path: FileRecord(stored_file.size, stored_file.mtime_ns, stored_file.content_hash,
+                                      [f"{file_path}:{start_indexes[i]}"
+                                       for i in range(stored_file.start, stored_file.end)])
+                for file_path, stored_file in self.files.items()}
+
+
+class ChunkStoreWriter:
+    """Writes a new chunk store next to the old one and swaps it in on commit, so readers never see a partial store"""
+
+    def __init__(self, path: str, settings: dict, commit_sha: Optional[str], dirty_paths: Optional[List[str]] = None):
+        self.path = path.rstrip(os.sep)
+        self.tmp_path = f"{self.path}.tmp"
+        self.settings = settings
+        self.commit_sha = commit_sha
+        self.dirty_paths = dirty_paths or []
+        self.files: Dict[str, StoredFile] = {}
+        self.num_chunks = 0
+        self.text_offset = 0
+        self.context_offset = 0
+
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.texts = open(os.path.join(self.tmp_path, 'texts.bin'), 'wb')
+        self.text_offsets = open(os.path.join(self.tmp_path, 'texts.idx'), 'wb')
+        self.contexts = open(os.path.join(self.tmp_path, 'contexts.bin'), 'wb')
+        self.context_offsets = open(os.path.join(self.tmp_path, 'contexts.idx'), 'wb')
+        self.columns = {column: open(os.path.join(self.tmp_path, f'{column}.bin'), 'wb') for column in INT_COLUMNS}
+        self.text_offsets.write(array('q', [0]).tobytes())
+        self.context_offsets.write(array('q', [0]).tobytes())
+
+    def add_file(self, file_path: str, record: FileRecord, chunks: ChunkBatch):
+        """Append the chunks of a file, files are kept in the order they are added"""
+        text_offsets = array('q')
+        for text in chunks.texts:
+            encoded = text.encode('utf-8')
+            self.texts.write(encoded)
+            self.text_offset += len(encoded)
+            text_offsets.append(self.text_offset)
+        self.text_offsets.write(text_offsets.tobytes())
+
+        context_offsets = array('q')
+        for context in chunks.contexts:
+            encoded = json.dumps(context, separators=(',', ':')).encode('utf-8')
+            self.contexts.write(encoded)
+            self.context_offset += len(encoded)
+            context_offsets.append(self.context_offset)
+        self.context_offsets.write(context_offsets.tobytes())
+
+        for column in INT_COLUMNS:
+            self.columns[column].write(chunks.columns[column].tobytes())
+
+        self.files[file_path] = StoredFile(record.size, record.mtime_ns, record.content_hash, self.num_chunks,
+                                           self.num_chunks + len(chunks))
+        self.num_chunks += len(chunks)
+
+    def _close_files(self):
+        for f in [self.texts, self.text_offsets, self.contexts, self.context_offsets, *self.columns.values()]:
+            f.close()
+
+    def commit(self):
+        """Write the file index and replace the old store with the new one"""
+        self._close_files()
+        meta = {
+            "version": CHUNK_STORE_VERSION,
+            "settings": self.settings,
+            "commit_sha": self.commit_sha,
+            "dirty_paths": [file_path for file_path in self.dirty_paths if file_path in self.files],
+            "files": {file_path: stored_file.to_dict() for file_path, stored_file in self.files.items()}
+        }
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        old_path = f"{self.path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def abort(self):
+        self._close_files()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
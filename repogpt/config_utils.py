@@ -3,18 +3,32 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 # from langchain_community.llms import OpenAI, GPT4All, LlamaCpp
 from langchain_openai import ChatOpenAI
 from langchain_community.llms import BaseLLM
-from typing import Optional
+from repogpt.chunk_settings import ChunkSettings
+from repogpt.chunk_store import chunk_store_path
+from repogpt.embedding_cache import CachedEmbeddings, EmbeddingCache
+from repogpt.embedding_scheduler import EmbeddingScheduler
+from repogpt.file_guards import FileGuards
+from repogpt.shards import SHARD_MODES
+from repogpt.summary_cache import get_summary_cache
+from typing import List, Optional
 import configparser
 
 
-def get_config_option(config, section: str, option: str) -> Optional[str]:
-    """Get option from section of config file if it exists"""
+def get_config_option(config, section: str, option: str, default: Optional[str] = None) -> Optional[str]:
+    """Get option from section of config file if it exists, otherwise fall back to the default if one is given"""
     if config.has_section(section) and config.has_option(section, option):
         return config.get(section, option)
+    elif default is not None:
+        return default
     else:
         raise ValueError(f"config file does not contain {section} section and {option} option!")
 
 
+def split_config_list(value: str) -> List[str]:
+    """Split a comma or newline separated config value into a list"""
+    return [item.strip() for item in value.replace('\n', ',').split(',') if item.strip()]
+
+
 def read_config_embeddings(config_file: str):
     """Initialize the embeddings object based on type specified in config file"""
     config = configparser.ConfigParser()
@@ -29,9 +43,41 @@ def read_config_embeddings(config_file: str):
     else:
         raise ValueError("Config file must contain 'embeddings' section!")
 
+    # reuse vectors for chunks that were already embedded by a previous run
+    if config.has_section("embedding-cache"):
+        cache_dir = get_config_option(config, "embedding-cache", "CACHE_DIR")
+        max_size_mb = get_config_option(config, "embedding-cache", "MAX_SIZE_MB", default="1024")
+        embeddings = CachedEmbeddings(embeddings, EmbeddingCache(cache_dir, int(max_size_mb)))
+
     return embeddings
 
 
+def read_config_embedding_options(config_file: str) -> dict:
+    """Get the embeddings sections of config file, configs with equal options produce the same vectors"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    return {section: dict(config.items(section)) for section in ("openai-embeddings", "hf-embeddings")
+            if config.has_section(section)}
+
+
+def read_config_embedding_scheduler(config_file: str, embeddings) -> EmbeddingScheduler:
+    """Initialize the scheduler that batches and rate limits embedding requests while indexing"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    _batch_size = get_config_option(config, "embedding-scheduler", "BATCH_SIZE", default="100")
+    _max_in_flight = get_config_option(config, "embedding-scheduler", "MAX_IN_FLIGHT", default="4")
+    _tokens_per_minute = get_config_option(config, "embedding-scheduler", "TOKENS_PER_MINUTE", default="0")
+    _max_retries = get_config_option(config, "embedding-scheduler", "MAX_RETRIES", default="6")
+
+    return EmbeddingScheduler(embeddings,
+                              batch_size=int(_batch_size),
+                              max_in_flight=int(_max_in_flight),
+                              tokens_per_minute=int(_tokens_per_minute),
+                              max_retries=int(_max_retries))
+
+
 def read_config_dir_paths(config_file: str) -> [str, str]:
     """Get repo and vector store paths from config file"""
     config = configparser.ConfigParser()
@@ -46,6 +92,89 @@ def read_config_dir_paths(config_file: str) -> [str, str]:
     return _repo_path, _vs_path, int(_vs_num_results), int(_chunk_size), int(_chunk_overlap)
 
 
+def read_config_chunk_settings(config_file: str) -> ChunkSettings:
+    """Get how files are split into chunks from config file"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    _chunk_size = get_config_option(config, "crawler", "CHUNK_SIZE")
+    _chunk_overlap = get_config_option(config, "crawler", "CHUNK_OVERLAP")
+    _chunking = get_config_option(config, "crawler", "CHUNKING", default="character")
+    _chunk_unit = get_config_option(config, "crawler", "CHUNK_UNIT", default="characters")
+    _embed_header = get_config_option(config, "crawler", "EMBED_HEADER", default="short")
+
+    return ChunkSettings(chunk_size=int(_chunk_size),
+                         chunk_overlap=int(_chunk_overlap),
+                         chunking=_chunking.strip().lower(),
+                         chunk_unit=_chunk_unit.strip().lower(),
+                         embed_header=_embed_header.strip().lower())
+
+
+def read_config_chunk_store_path(config_file: str, vs_path: str) -> str:
+    """Get the chunk store path from config file, defaulting to next to the vector store"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    return get_config_option(config, "crawler", "CHUNK_STORE", default=chunk_store_path(vs_path))
+
+
+def read_config_shard_options(config_file: str) -> dict:
+    """Get how the vector store is split into shards from config file, shard_by is none for a single vector store"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    _shard_by = get_config_option(config, "vectorstore", "SHARD_BY", default="none").strip().lower()
+    if _shard_by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode {_shard_by}, must be one of {', '.join(SHARD_MODES)}!")
+    _num_shards = get_config_option(config, "vectorstore", "NUM_SHARDS", default="8")
+    _shard_workers = get_config_option(config, "vectorstore", "SHARD_WORKERS", default="4")
+
+    return {
+        "shard_by": _shard_by,
+        "num_shards": int(_num_shards),
+        "shard_workers": int(_shard_workers)
+    }
+
+
+def read_config_crawler_options(config_file: str) -> dict:
+    """Get the optional crawler settings from config file as keyword arguments for the crawler"""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    _workers = get_config_option(config, "crawler", "WORKERS", default="1")
+    _batch_size = get_config_option(config, "crawler", "BATCH_SIZE", default="1000")
+    _exclude = get_config_option(config, "crawler", "EXCLUDE", default="")
+    _file_source = get_config_option(config, "crawler", "FILE_SOURCE", default="walk")
+    _include_untracked = get_config_option(config, "crawler", "INCLUDE_UNTRACKED", default="false")
+
+    _max_file_size = get_config_option(config, "crawler", "MAX_FILE_SIZE", default="1000000")
+    _max_avg_line_length = get_config_option(config, "crawler", "MAX_AVG_LINE_LENGTH", default="250")
+    _max_line_length = get_config_option(config, "crawler", "MAX_LINE_LENGTH", default="5000")
+    _generated_markers = get_config_option(config, "crawler", "GENERATED_MARKERS", default="")
+
+    # reuse the summaries of files parsed by a previous crawl
+    summary_cache = None
+    if config.has_section("summary-cache"):
+        cache_dir = get_config_option(config, "summary-cache", "CACHE_DIR")
+        max_size_mb = get_config_option(config, "summary-cache", "MAX_SIZE_MB", default="256")
+        summary_cache = get_summary_cache(cache_dir, int(max_size_mb))
+
+    file_guards = FileGuards(max_file_size=int(_max_file_size),
+                             max_avg_line_length=int(_max_avg_line_length),
+                             max_line_length=int(_max_line_length),
+                             generated_markers=split_config_list(_generated_markers) or None)
+
+    return {
+        "workers": int(_workers),
+        "batch_size": int(_batch_size),
+        "exclude_patterns": split_config_list(_exclude),
+        "file_source": _file_source.strip().lower(),
+        "include_untracked": _include_untracked.strip().lower() in ("true", "yes", "1"),
+        "file_guards": file_guards,
+        "summary_cache": summary_cache
+    }
+
+
 def read_config_llm(config_file: str) -> BaseLLM:
     """Initialize LLM object based on type specified in config file"""
     config = configparser.ConfigParser()
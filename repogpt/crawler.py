@@ -9,12 +9,32 @@ from repogpt.parsers.java_treesitter_parser import JavaTreeSitterParser
 from repogpt.parsers.js_treesitter_parser import JsTreeSitterParser
 from repogpt.parsers.go_treesitter_parser import GoTreeSitterParser
 from repogpt.parsers.treesitter import FileSummary
+from repogpt.line_index import LineIndex
+from repogpt.syntax_splitter import split_on_definitions
+from repogpt.chunk_context import render_chunk, render_header, snippet_context
+from repogpt.chunk_batch import ChunkBatch
+from repogpt.chunk_settings import ChunkSettings
+from repogpt.chunk_store import ChunkStore, ChunkStoreWriter
+from repogpt.manifest import FileRecord, Manifest, ManifestDiff, manifest_path
+from repogpt.checkpoint import IndexCheckpoint, checkpoint_path
+from repogpt.git_utils import get_changed_files, get_head_sha, list_files as list_git_files, list_tracked_files
+from repogpt.pipeline import ordered_map, prefetch, process_pool
+from repogpt.embedding_cache import embedding_model_name
+from repogpt.embedding_scheduler import EmbeddingScheduler
+from repogpt.file_guards import FileGuards
+from repogpt.run_report import RunReport
+from repogpt.summary_cache import SummaryCache
+from repogpt.shards import ShardLayout, shard_layout_path, shard_vs_path
+from repogpt.tokens import count_tokens, get_tokenizer
+from repogpt.walker import CrawlReport, IgnoreMatcher, walk_repo
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
 import fnmatch
+import subprocess
 import logging
-from functools import partial
+from functools import lru_cache, partial
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("repogpt_crawler_logger")
@@ -41,13 +61,27 @@ LANG_MAPPING = {
     '.html': Language.HTML
 }
 
+# TODO: Add parsers for more languages
+PARSERS = {
+    '.py': PythonParser,
+    '.cpp': CppTreeSitterParser,
+    '.java': JavaTreeSitterParser,
+    '.js': JsTreeSitterParser,
+    '.go': GoTreeSitterParser
+}
+
+# extensions whose parsers need the tree-sitter grammars
+TREESITTER_EXTENSIONS = {extension for extension, parser in PARSERS.items() if parser.grammar}
+
 
 class FileProperties:
 
-    def __init__(self, dir_path: str, file_name: str, extension: str):
+    def __init__(self, dir_path: str, file_name: str, extension: str, blob_sha: Optional[str] = None):
         self.dir_path = dir_path
         self.file_name = file_name
         self.extension = extension
+        # git blob sha of the file contents when enumerated from the git index
+        self.blob_sha = blob_sha
 
 
 def contains_hidden_dir(dir_path: str) -> bool:
@@ -62,105 +96,873 @@ def is_git_dir(dir_path: str) -> bool:
     return os.path.isdir(git_dir)
 
 
+@lru_cache(maxsize=None)
+def get_length_function(chunk_unit: str) -> Callable[[str], int]:
+    """Function measuring chunk sizes in either characters or tokens"""
+    if chunk_unit == "characters":
+        return len
+    elif chunk_unit == "tokens":
+        return count_tokens
+    raise ValueError(f"Unknown chunk unit {chunk_unit}, must be either characters or tokens!")
+
+
+@lru_cache(maxsize=None)
+def get_splitter(
+        language: Language,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunk_unit: str = "characters"
+) -> RecursiveCharacterTextSplitter:
+    """Get the splitter for a language. Splitters are shared across files within a process rather than rebuilding the
+    language separators for every file"""
+    return RecursiveCharacterTextSplitter.from_language(
+        language=language,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=get_length_function(chunk_unit),
+        add_start_index=True)
+
+
+def require_grammars(extensions: Iterable[str]):
+    """Open the grammar bundle if any of the extensions is parsed with tree-sitter, so a missing bundle stops the run
+    before any file is chunked instead of failing every file of those languages"""
+    if not TreeSitterParser.loaded and any(extension in TREESITTER_EXTENSIONS for extension in extensions):
+        TreeSitterParser.initialize_treesitter()
+
+
+def init_crawl_worker(extensions: List[str], chunk_settings: ChunkSettings):
+    """Warm up the per-process caches of a crawl worker for the file types it is going to see"""
+    for language in {LANG_MAPPING[extension] for extension in extensions}:
+        get_splitter(language, chunk_settings.chunk_size, chunk_settings.chunk_overlap, chunk_settings.chunk_unit)
+    # load the grammars and set up the parsers once instead of on the first file of each language
+    TreeSitterParser.preload_parsers({PARSERS[extension].grammar for extension in extensions
+                                      if extension in TREESITTER_EXTENSIONS})
+    # load the tokenizer up front when chunks are measured in tokens, it is not needed otherwise
+    if chunk_settings.chunk_unit == "tokens":
+        get_tokenizer()
+
+
 def process_file(
         file_contents: List[Document],
         dir_path: str,
         file_name: str,
         extension: str,
-        chunk_size: int,
-        chunk_overlap: int
+        chunk_settings: ChunkSettings,
+        run_report: Optional[RunReport] = None,
+        summary_cache: Optional[SummaryCache] = None
 ) -> List[Document]:
-    """For a given file, get the summary, split into chunks and create context document chunks to be indexed"""
+    """For a given file, get the summary, split into chunks and create context document chunks to be indexed, as set
+    by chunk_settings. Summaries of files parsed before are taken from the summary cache when one is given"""
     file_doc = file_contents[0]
+    run_report = run_report if run_report is not None else RunReport()
+    language = LANG_MAPPING[extension]
 
     # get file summary for raw file
-    # TODO: Add parsers for more languages
-    if extension == '.py':
-        file_summary = PythonParser.get_file_summary(file_doc.page_content, file_name)
-    elif extension == '.cpp':
-        file_summary = CppTreeSitterParser.get_file_summary(file_doc.page_content, file_name)
-    elif extension == '.java':
-        file_summary = JavaTreeSitterParser.get_file_summary(file_doc.page_content, file_name)
-    elif extension == '.js':
-        file_summary = JsTreeSitterParser.get_file_summary(file_doc.page_content, file_name)
-    elif extension == '.go':
-        file_summary = GoTreeSitterParser.get_file_summary(file_doc.page_content, file_name)
-    else:
-        file_summary = FileSummary()
+    parser = PARSERS.get(extension)
+    run_report.parsers[language.value] = parser.__name__ if parser else None
+    with run_report.stage("parse") as stats:
+        if parser is None:
+            file_summary = FileSummary()
+        elif summary_cache is not None:
+            file_summary = summary_cache.get_file_summary(parser, file_doc.page_content, file_name)
+        else:
+            file_summary = parser.get_file_summary(file_doc.page_content, file_name)
+        stats.files = 1
 
     # split file contents based on file extension
-    splitter = RecursiveCharacterTextSplitter.from_language(
-        language=LANG_MAPPING[extension],
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        add_start_index=True)
-    split_docs = splitter.split_documents(file_contents)
+    with run_report.stage("split") as stats:
+        splitter = get_splitter(language, chunk_settings.chunk_size, chunk_settings.chunk_overlap,
+                                chunk_settings.chunk_unit)
+        if chunk_settings.chunking == "syntax" and parser:
+            split_docs = split_on_definitions(file_doc, file_summary, splitter, chunk_settings.chunk_size,
+                                              parser.first_line, get_length_function(chunk_settings.chunk_unit))
+        else:
+            split_docs = splitter.split_documents(file_contents)
+        stats.files = 1
+        stats.chunks = len(split_docs)
+
+    # add file path, character offsets, line range and summary to each chunk
+    with run_report.stage("header") as stats:
+        add_chunk_headers(split_docs, file_doc.page_content, dir_path, file_name, file_summary,
+                          chunk_settings.embed_header, chunk_settings.chunk_unit)
+        stats.chunks = len(split_docs)
+
+    return split_docs
+
 
-    # add file path, starting line and summary to each chunk
+def add_chunk_headers(
+        split_docs: List[Document],
+        text: str,
+        dir_path: str,
+        file_name: str,
+        file_summary: FileSummary,
+        embed_header: str = "short",
+        chunk_unit: str = "characters"
+):
+    """Add the character offsets, line range and enclosing classes and methods to the metadata of each chunk and wrap
+    its code in the header chosen by embed_header. code_start and code_end locate the code within the chunk so the full
+    header can be rendered from the metadata when a prompt is built. When chunks are measured in tokens the token count
+    of each chunk as it is rendered into prompts is added as well"""
+    line_index = LineIndex(text)
     for doc in split_docs:
-        starting_line = file_doc.page_content[:doc.metadata['start_index']].count('\n') + 1
-        ending_line = starting_line + doc.page_content.count('\n')
+        start_index = doc.metadata['start_index']
+        end_index = start_index + len(doc.page_content)
+        starting_line = line_index.line_number(start_index)
+        ending_line = line_index.line_number(end_index)
+        doc.metadata['end_index'] = end_index
         doc.metadata['starting_line'] = starting_line
         doc.metadata['ending_line'] = ending_line
 
         # get methods and classes associated with chunk
-        method_class_summary = TreeSitterParser.get_closest_method_class_in_snippet(file_summary,
-                                                                                    starting_line,
-                                                                                    ending_line)
-        doc.page_content = f"The following code snippet is from a file at location " \
-                           f"{os.path.join(dir_path, file_name)} " \
-                           f"starting at line {starting_line} and ending at line {ending_line}. " \
-                           f"{method_class_summary} " \
-                           f"The code snippet starting at line {starting_line} and ending at line " \
-                           f"{ending_line} is \n ```\n{doc.page_content}\n``` "
+        context = snippet_context(file_summary, starting_line, ending_line)
+        doc.metadata['context'] = context
+
+        header, footer = render_header(embed_header, os.path.join(dir_path, file_name), starting_line, ending_line,
+                                       context)
+        doc.metadata['code_start'] = len(header)
+        doc.metadata['code_end'] = len(header) + len(doc.page_content)
+        doc.page_content = f"{header}{doc.page_content}{footer}"
+        if chunk_unit == "tokens":
+            # prompts get the full header whichever header was embedded
+            doc.metadata['num_tokens'] = count_tokens(render_chunk(doc.page_content, doc.metadata))
 
-    return split_docs
 
+def file_properties_from_path(file_path: str) -> FileProperties:
+    dir_path, file_name = os.path.split(file_path)
+    return FileProperties(dir_path, file_name, os.path.splitext(file_name)[1])
 
-def filter_files(root_dir: str) -> List[FileProperties]:
-    """Crawl the root directory and filter out invalid files that will not be indexed"""
+
+def filter_files(
+        root_dir: str,
+        exclude_patterns: Optional[List[str]] = None,
+        report: Optional[CrawlReport] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None
+) -> List[FileProperties]:
+    """Crawl the root directory and filter out invalid files that will not be indexed. With the "walk" file source the
+    file system is walked and directories ignored by git or matching the exclude patterns are pruned. With the "git"
+    file source the files tracked in the git index (optionally plus untracked files that are not ignored) are listed
+    along with their blob shas. Files that are too large, binary, minified or generated are skipped by the file
+    guards"""
     if not is_git_dir(root_dir):
         raise ValueError(f"{root_dir} is not a valid git root directory")
 
+    report = report if report is not None else CrawlReport()
+    file_guards = file_guards if file_guards is not None else FileGuards()
+    if file_source == "walk":
+        candidates = ((dir_path, file, None) for dir_path, file in walk_repo(root_dir, exclude_patterns, report))
+    elif file_source == "git":
+        candidates = iter_git_files(root_dir, exclude_patterns, report, include_untracked)
+    else:
+        raise ValueError(f"Unknown file source {file_source}, must be either walk or git!")
+
     files_to_crawl = []
-    for dir_path, dir_names, filenames in os.walk(root_dir):
-        for file in filenames:
-            _, extension = os.path.splitext(file)
-            # only want to crawl accepted file types and files not in hidden directories
-            if extension in LANG_MAPPING and not contains_hidden_dir(dir_path):
-                files_to_crawl.append(FileProperties(dir_path, file, extension))
-            else:
-                logger.info(f"Skipping {os.path.join(dir_path, file)} - File or directory type not supported.")
+    for dir_path, file, blob_sha in candidates:
+        _, extension = os.path.splitext(file)
+        # only want to crawl accepted file types
+        if extension not in LANG_MAPPING:
+            report.skip("unsupported file types")
+            continue
+
+        skip_reason = guard_file(os.path.join(dir_path, file), file_guards)
+        if skip_reason:
+            report.skip(skip_reason)
+            continue
+
+        files_to_crawl.append(FileProperties(dir_path, file, extension, blob_sha))
+        report.files_accepted += 1
+
+    logger.info(f"Crawled {root_dir}. {report.summary()}")
     return files_to_crawl
 
 
-def process_and_split(file: FileProperties, chunk_size: int, chunk_overlap: int) -> Optional[List[Document]]:
+def guard_file(file_path: str, file_guards: FileGuards) -> Optional[str]:
+    """Reason the file guards reject a file, or None if it should be crawled"""
+    try:
+        return file_guards.skip_reason(file_path)
+    except OSError as e:
+        logger.error(f"Error reading file {file_path}. Skipping file. {e}")
+        return "unreadable files"
+
+
+def iter_git_files(
+        root_dir: str,
+        exclude_patterns: Optional[List[str]],
+        report: CrawlReport,
+        include_untracked: bool
+) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """List files from the git index, skipping hidden paths and paths matching the exclude patterns"""
+    # git has already applied the repo's ignore files, tracked files are indexed even if they match them
+    matcher = IgnoreMatcher(root_dir, exclude_patterns, use_ignore_files=False)
+    for file_path, blob_sha in list_git_files(root_dir, include_untracked):
+        if matcher.is_path_ignored(os.path.relpath(file_path, root_dir).replace(os.sep, '/')):
+            report.skip("ignored files")
+            continue
+        dir_path, file = os.path.split(file_path)
+        yield dir_path, file, blob_sha
+
+
+def process_and_split(
+        file: FileProperties,
+        chunk_settings: ChunkSettings,
+        run_report: Optional[RunReport] = None,
+        summary_cache: Optional[SummaryCache] = None
+) -> Optional[List[Document]]:
     """For a given file, load it into memory and process it"""
+    file_path = os.path.join(file.dir_path, file.file_name)
+    run_report = run_report if run_report is not None else RunReport()
     try:
-        loader = TextLoader(os.path.join(file.dir_path, file.file_name), encoding='utf-8')
-        chunks = process_file(loader.load(), file.dir_path, file.file_name, file.extension, chunk_size, chunk_overlap)
+        with run_report.stage("read") as stats:
+            loader = TextLoader(file_path, encoding='utf-8')
+            file_contents = loader.load()
+            stats.files = 1
+            stats.bytes = os.path.getsize(file_path)
+        chunks = process_file(file_contents, file.dir_path, file.file_name, file.extension, chunk_settings, run_report,
+                              summary_cache)
     except Exception as e:
-        logger.error(f"Error processing file {os.path.join(file.dir_path, file.file_name)}. Skipping file. {e}")
+        logger.error(f"Error processing file {file_path}. Skipping file. {e}")
         return None
     return chunks
 
 
-def crawl_and_split(root_dir: str, chunk_size: int = 3000, chunk_overlap: int = 0) -> List[Document]:
-    """Crawl git directory and process files"""
-    filtered_files = filter_files(root_dir)
+def process_and_report(
+        file: FileProperties,
+        chunk_settings: ChunkSettings,
+        summary_cache: Optional[SummaryCache] = None
+) -> Tuple[Optional[ChunkBatch], RunReport]:
+    """Process a file, returning its chunks as a columnar batch, which is far smaller to send back from a worker than
+    a list of documents, along with a report of where the time went"""
+    run_report = RunReport()
+    docs = process_and_split(file, chunk_settings, run_report, summary_cache)
+    return ChunkBatch.from_documents(docs) if docs is not None else None, run_report
 
-    process_and_split_partial_function = partial(process_and_split, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
-    split_docs = []
-    with tqdm(total=len(filtered_files), desc='Chunking documents...', ncols=80) as pbar:
-        for ff in filtered_files:
-            docs = process_and_split_partial_function(ff)
-            if docs:
-                split_docs.extend(docs)
+def map_files(
+        func: Callable,
+        files: List[FileProperties],
+        workers: int = 1,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        executor: Optional[Executor] = None
+) -> Iterator:
+    """Apply func to each file, spreading the files over a process pool when workers > 1. Results are yielded in the
+    same order as files. A shared executor is used instead of starting a new pool when given"""
+    require_grammars(file.extension for file in files)
+
+    # hand out files in small chunks to amortize the IPC overhead while keeping the workers evenly loaded
+    chunksize = max(1, min(64, len(files) // (max(workers, 1) * 8)))
+    yield from ordered_map(func, files, workers, chunksize, initializer=initializer, initargs=initargs,
+                           executor=executor)
+
+
+def split_files(
+        files: List[FileProperties],
+        chunk_settings: ChunkSettings,
+        workers: int = 1,
+        run_report: Optional[RunReport] = None,
+        executor: Optional[Executor] = None,
+        summary_cache: Optional[SummaryCache] = None
+) -> Iterator[Tuple[FileProperties, Optional[ChunkBatch]]]:
+    """Process files in order, yielding each file with its chunks or None if the file could not be processed. The
+    stage timings of each file are merged into run_report"""
+    run_report = run_report if run_report is not None else RunReport()
+    process_and_report_partial_function = partial(process_and_report, chunk_settings=chunk_settings,
+                                                  summary_cache=summary_cache)
+
+    with tqdm(total=len(files), desc='Chunking documents...', ncols=80) as pbar:
+        extensions = sorted({file.extension for file in files})
+        results = map_files(process_and_report_partial_function, files, workers,
+                            initializer=init_crawl_worker, initargs=(extensions, chunk_settings),
+                            executor=executor)
+        for file, (chunks, file_report) in zip(files, results):
+            run_report.merge(file_report)
+            read_stats = file_report.stages.get("read")
+            run_report.record_file(os.path.join(file.dir_path, file.file_name), file_report.wall_seconds(),
+                                   len(chunks) if chunks else 0, read_stats.bytes if read_stats else 0)
+            yield file, chunks
             pbar.update()
 
+
+def iter_split_batches(
+        files: List[FileProperties],
+        chunk_settings: ChunkSettings,
+        workers: int = 1,
+        batch_size: int = 1000,
+        run_report: Optional[RunReport] = None,
+        executor: Optional[Executor] = None,
+        summary_cache: Optional[SummaryCache] = None
+) -> Iterator[List[Tuple[FileProperties, Optional[ChunkBatch]]]]:
+    """Process files in order and group them into batches of at least batch_size chunks. Batches always end on a file
+    boundary so every file in a batch is complete"""
+    batch = []
+    num_chunks = 0
+    for file, chunks in split_files(files, chunk_settings, workers, run_report, executor, summary_cache):
+        batch.append((file, chunks))
+        num_chunks += len(chunks) if chunks else 0
+        if num_chunks >= batch_size:
+            yield batch
+            batch = []
+            num_chunks = 0
+    if batch:
+        yield batch
+
+
+def crawl_and_split(
+        root_dir: str,
+        chunk_size: int = 3000,
+        chunk_overlap: int = 0,
+        workers: int = 1,
+        exclude_patterns: Optional[List[str]] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None,
+        chunking: str = "character",
+        chunk_unit: str = "characters",
+        embed_header: str = "short",
+        summary_cache: Optional[SummaryCache] = None
+) -> List[Document]:
+    """Crawl git directory and process files, using a pool of worker processes when workers > 1"""
+    filtered_files = filter_files(root_dir, exclude_patterns, file_source=file_source,
+                                  include_untracked=include_untracked, file_guards=file_guards)
+
+    chunk_settings = ChunkSettings(chunk_size, chunk_overlap, chunking, chunk_unit, embed_header)
+    split_docs = []
+    for _, chunks in split_files(filtered_files, chunk_settings, workers, summary_cache=summary_cache):
+        if chunks:
+            split_docs.extend(chunks.iter_documents())
+
     return split_docs
 
 
-def index(docs: List[Document], embedding_type, vs_path: str):
-    return DeepLake.from_documents(docs, embedding_type, dataset_path=vs_path)
+def index(docs: List[Document], embedding_type, vs_path: str, **kwargs):
+    return DeepLake.from_documents(docs, embedding_type, dataset_path=vs_path, **kwargs)
+
+
+def index_batches(
+        batches: Iterable[Tuple[ChunkBatch, Any]],
+        vs: DeepLake,
+        scheduler: EmbeddingScheduler,
+        on_commit: Optional[Callable[[Any], None]] = None,
+        run_report: Optional[RunReport] = None,
+        on_begin: Optional[Callable[[Any], None]] = None
+) -> int:
+    """Embed and append each (chunks, payload) batch to the vector store as it arrives. The next batches are produced in
+    the background while the current one is being embedded and batches are written to the store in order. on_begin is
+    called with the payload of each batch right before its chunks are written to the store and on_commit once they are
+    all in. Returns the number of chunks indexed"""
+    run_report = run_report if run_report is not None else RunReport()
+    groups = (((chunks, payload), chunks.texts) for chunks, payload in prefetch(batches))
+
+    num_chunks = 0
+    for (chunks, payload), vectors in scheduler.embed(groups):
+        if chunks:
+            if on_begin is not None:
+                on_begin(payload)
+            with run_report.stage("store") as stats:
+                # the vectors are already computed so write them to the underlying dataset directly
+                vs.vectorstore.add(text=chunks.texts,
+                                   metadata=chunks.metadatas(),
+                                   embedding=vectors,
+                                   id=chunks.ids())
+                stats.chunks = len(chunks)
+            num_chunks += len(chunks)
+        if on_commit is not None:
+            on_commit(payload)
+    return num_chunks
+
+
+def get_git_state(root_dir: str) -> Tuple[Optional[str], List[str]]:
+    """The commit a repo is indexed at and the files whose contents differ from it: uncommitted changes and untracked
+    files. Diffing against the commit no longer shows these files once they change back or are deleted, so the next
+    update rechecks them against their records"""
+    commit_sha = get_head_sha(root_dir)
+    if commit_sha is None:
+        return None, []
+    dirty_paths, _ = get_changed_files(root_dir, commit_sha)
+    return commit_sha, dirty_paths
+
+
+def diff_git_changes(
+        root_dir: str,
+        manifest: Manifest,
+        exclude_patterns: Optional[List[str]] = None,
+        file_guards: Optional[FileGuards] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False
+) -> Optional[ManifestDiff]:
+    """Find the files that changed since the commit recorded in the manifest with git instead of walking the whole
+    repo. Files that were dirty when they were indexed are always compared against their records again. Untracked files
+    are left out like filter_files leaves them out with the git file source. Returns None if the recorded commit cannot
+    be diffed against"""
+    with_untracked = file_source != "git" or include_untracked
+    try:
+        changed_paths, deleted_paths = get_changed_files(root_dir, manifest.commit_sha, with_untracked)
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Could not diff against indexed commit {manifest.commit_sha}, falling back to a full crawl. "
+                       f"{e.stderr}")
+        return None
+
+    dirty_paths = [file_path for file_path in manifest.dirty_paths if file_path in manifest.records]
+    untracked_paths = []
+    if not with_untracked:
+        # untracked files indexed by an earlier run are dropped, as a full listing of the git index would drop them
+        tracked_paths = set(list_tracked_files(root_dir, dirty_paths))
+        untracked_paths = [file_path for file_path in dirty_paths if file_path not in tracked_paths]
+        dirty_paths = [file_path for file_path in dirty_paths if file_path in tracked_paths]
+    candidate_paths = list(dict.fromkeys(changed_paths + dirty_paths))
+
+    # with the git file source tracked files are indexed even if the repo's ignore files match them
+    matcher = IgnoreMatcher(root_dir, exclude_patterns, use_ignore_files=file_source != "git")
+
+    def is_ignored(file_path: str) -> bool:
+        return matcher.is_path_ignored(os.path.relpath(file_path, root_dir).replace(os.sep, '/'))
+
+    # files that are gone, ignored or no longer pass the guards are dropped from the index like deleted files
+    file_guards = file_guards if file_guards is not None else FileGuards()
+    accepted_paths, removed_paths = [], deleted_paths + untracked_paths
+    for file_path in candidate_paths:
+        if os.path.splitext(file_path)[1] not in LANG_MAPPING:
+            continue
+        if not os.path.isfile(file_path) or is_ignored(file_path) or guard_file(file_path, file_guards):
+            removed_paths.append(file_path)
+        else:
+            accepted_paths.append(file_path)
+
+    # an edited .gitignore or EXCLUDE setting ignores indexed files without them showing up in the diff
+    removed_paths.extend(file_path for file_path in manifest.records if is_ignored(file_path))
+    return manifest.diff_changed(accepted_paths, removed_paths)
+
+
+def plan_index(
+        vs_path: str,
+        embedding_type,
+        settings: dict,
+        diff_files: Callable[[Manifest, bool], ManifestDiff],
+        commit_sha: Optional[str],
+        resume: bool = False,
+        dirty_paths: Optional[List[str]] = None
+) -> Tuple[DeepLake, IndexCheckpoint, Dict[str, FileRecord], List[str]]:
+    """Work out which files to index against the manifest stored next to the vector store, remove the chunks of changed
+    and deleted files from the store and checkpoint the plan. diff_files compares the files to index against the old
+    manifest and is told whether the index is being rebuilt. commit_sha and dirty_paths are recorded in the new
+    manifest for the next git diff. The embedding model is recorded along with settings, so switching models rebuilds
+    the index instead of mixing vectors of both. Returns the store, the checkpoint, the records the manifest will end up
+    with and the files to index. With resume the plan of an interrupted run is picked up instead"""
+    settings = {**settings, "embedding_model": embedding_model_name(embedding_type)}
+    checkpoint = IndexCheckpoint.load(checkpoint_path(vs_path))
+    if checkpoint is not None and checkpoint.settings != settings:
+        logger.warning("Discarding checkpoint of an interrupted run with different chunk or embedding settings.")
+        checkpoint = None
+        overwrite = True
+    else:
+        overwrite = False
+
+    if resume and checkpoint is not None:
+        logger.info(f"Resuming interrupted run, {len(checkpoint.committed)} of {len(checkpoint.files_to_index)} "
+                    f"files already indexed.")
+        records = dict(checkpoint.records)
+        records.update(checkpoint.committed)
+        vs = DeepLake(dataset_path=vs_path, embedding=embedding_type)
+        # the batch that was being written when the run died may have left some of its chunks in the store
+        if checkpoint.uncommitted_ids:
+            vs.delete(ids=checkpoint.uncommitted_ids)
+        return vs, checkpoint, records, checkpoint.pending_files()
+
+    if resume:
+        logger.info("No interrupted run to resume.")
+    # the checkpoint describes what an interrupted run left in the store better than the manifest does
+    old_manifest = checkpoint.to_manifest() if checkpoint is not None else Manifest.load(manifest_path(vs_path))
+    rebuild = overwrite or old_manifest is None or old_manifest.settings != settings or not os.path.exists(vs_path)
+    if rebuild:
+        old_manifest = Manifest(settings=settings)
+
+    manifest_diff = diff_files(old_manifest, rebuild)
+    logger.info(f"{len(manifest_diff.added)} files added, {len(manifest_diff.changed)} changed, "
+                f"{len(manifest_diff.deleted)} deleted and {len(manifest_diff.unchanged)} unchanged since last "
+                f"index.")
+
+    records = manifest_diff.records
+    files_to_index = manifest_diff.added + manifest_diff.changed
+    vs = DeepLake(dataset_path=vs_path, embedding=embedding_type, overwrite=rebuild)
+    stale_ids = manifest_diff.stale_chunk_ids(old_manifest)
+    if checkpoint is not None and not rebuild:
+        # chunks of the batch an interrupted run was writing are not in its manifest
+        stale_ids.extend(checkpoint.uncommitted_ids)
+    if stale_ids:
+        vs.delete(ids=stale_ids)
+
+    checkpoint = IndexCheckpoint(checkpoint_path(vs_path), settings, commit_sha, records, files_to_index, dirty_paths)
+    checkpoint.start()
+    return vs, checkpoint, records, files_to_index
+
+
+def batch_files(
+        batches: Iterable[List[Tuple[FileProperties, Optional[ChunkBatch]]]],
+        records: Dict[str, FileRecord]
+) -> Iterator[Tuple[ChunkBatch, Dict[str, FileRecord]]]:
+    """Combine the chunks of each batch of files into one ChunkBatch along with the updated records of its files"""
+    for batch in batches:
+        chunks_to_index = ChunkBatch()
+        batch_records = {}
+        for file, chunks in batch:
+            file_path = os.path.join(file.dir_path, file.file_name)
+            # failed files are left out of the manifest so they are retried on the next run
+            if chunks is not None:
+                record = records[file_path]
+                batch_records[file_path] = FileRecord(record.size, record.mtime_ns, record.content_hash,
+                                                      chunks.ids())
+                chunks_to_index.extend(chunks)
+        yield chunks_to_index, batch_records
+
+
+def run_index(
+        vs: DeepLake,
+        vs_path: str,
+        embedding_type,
+        checkpoint: IndexCheckpoint,
+        records: Dict[str, FileRecord],
+        batches: Iterable[Tuple[ChunkBatch, Dict[str, FileRecord]]],
+        scheduler: Optional[EmbeddingScheduler] = None,
+        run_report: Optional[RunReport] = None
+) -> DeepLake:
+    """Index the planned batches, committing each one to the checkpoint, then save the manifest with the settings of
+    the plan"""
+    run_report = run_report if run_report is not None else RunReport()
+    scheduler = scheduler if scheduler is not None else EmbeddingScheduler(embedding_type)
+    scheduler.run_report = run_report
+    try:
+        num_chunks = index_batches(batches, vs, scheduler, on_commit=checkpoint.commit, run_report=run_report,
+                                   on_begin=checkpoint.begin)
+    except BaseException:
+        logger.error(f"Indexing was interrupted after {len(checkpoint.committed)} of {len(checkpoint.files_to_index)} "
+                     f"files. Run again with --resume to continue from the last committed batch.")
+        raise
+    logger.info(f"{num_chunks} chunks indexed.")
+
+    # files that failed to process are not committed and are left out of the manifest
+    pending = set(checkpoint.pending_files())
+    records = {file_path: record for file_path, record in records.items() if file_path not in pending}
+    records.update(checkpoint.committed)
+    Manifest(records, checkpoint.settings, checkpoint.commit_sha, checkpoint.dirty_paths).save(manifest_path(vs_path))
+    checkpoint.remove()
+    return vs
+
+
+def diff_repo(
+        root_dir: str,
+        old_manifest: Manifest,
+        use_git: bool = False,
+        exclude_patterns: Optional[List[str]] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None,
+        run_report: Optional[RunReport] = None
+) -> ManifestDiff:
+    """Compare the files of a repo against a manifest. With use_git only the files git reports as changed since the
+    commit recorded in the manifest are looked at, otherwise the repo is crawled"""
+    run_report = run_report if run_report is not None else RunReport()
+    if use_git and old_manifest.commit_sha:
+        manifest_diff = diff_git_changes(root_dir, old_manifest, exclude_patterns, file_guards, file_source,
+                                         include_untracked)
+        if manifest_diff is not None:
+            return manifest_diff
+
+    with run_report.stage("walk") as stats:
+        filtered_files = filter_files(root_dir, exclude_patterns, file_source=file_source,
+                                      include_untracked=include_untracked, file_guards=file_guards)
+        stats.files = len(filtered_files)
+    file_paths = [os.path.join(ff.dir_path, ff.file_name) for ff in filtered_files]
+    blob_shas = {file_path: ff.blob_sha for file_path, ff in zip(file_paths, filtered_files) if ff.blob_sha}
+    return old_manifest.diff(file_paths, blob_shas)
+
+
+def update_index(
+        root_dir: str,
+        embedding_type,
+        vs_path: str,
+        chunk_settings: Optional[ChunkSettings] = None,
+        workers: int = 1,
+        use_git: bool = False,
+        batch_size: int = 1000,
+        exclude_patterns: Optional[List[str]] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None,
+        scheduler: Optional[EmbeddingScheduler] = None,
+        resume: bool = False,
+        run_report: Optional[RunReport] = None,
+        executor: Optional[Executor] = None,
+        summary_cache: Optional[SummaryCache] = None
+):
+    """Crawl git directory and only chunk and index the files that were added or changed since the last run according
+    to the manifest stored next to the vector store. Chunks of changed and deleted files are removed from the store.
+    With use_git the changed files are found by diffing against the last indexed commit instead of crawling. Files are
+    chunked as set by chunk_settings and indexed in batches of batch_size chunks so memory use does not grow with the
+    size of the repo.
+
+    Progress is checkpointed after every batch. With resume an interrupted run carries on from its last committed batch
+    without crawling again, otherwise the next run picks up whatever the interrupted run committed. Stage timings are
+    collected in run_report. Files are chunked on the shared executor when one is given"""
+    if not is_git_dir(root_dir):
+        raise ValueError(f"{root_dir} is not a valid git root directory")
+
+    run_report = run_report if run_report is not None else RunReport()
+    chunk_settings = chunk_settings if chunk_settings is not None else ChunkSettings()
+    settings = chunk_settings.to_dict()
+
+    def diff_files(old_manifest: Manifest, rebuild: bool) -> ManifestDiff:
+        manifest_diff = diff_repo(root_dir, old_manifest, use_git and not rebuild, exclude_patterns, file_source,
+                                  include_untracked, file_guards, run_report)
+        # before the chunks of changed files are deleted from the store
+        require_grammars(os.path.splitext(file_path)[1] for file_path in manifest_diff.added + manifest_diff.changed)
+        return manifest_diff
+
+    commit_sha, dirty_paths = get_git_state(root_dir)
+    vs, checkpoint, records, files_to_index = plan_index(vs_path, embedding_type, settings, diff_files, commit_sha,
+                                                         resume, dirty_paths)
+
+    files = [file_properties_from_path(file_path) for file_path in files_to_index]
+    batches = iter_split_batches(files, chunk_settings, workers, batch_size, run_report, executor, summary_cache)
+    return run_index(vs, vs_path, embedding_type, checkpoint, records, batch_files(batches, records), scheduler,
+                     run_report)
+
+
+def update_chunk_store(
+        root_dir: str,
+        store_path: str,
+        chunk_settings: Optional[ChunkSettings] = None,
+        workers: int = 1,
+        use_git: bool = False,
+        exclude_patterns: Optional[List[str]] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None,
+        run_report: Optional[RunReport] = None,
+        summary_cache: Optional[SummaryCache] = None
+) -> ChunkStore:
+    """Crawl git directory and persist its chunks to a chunk store that can be embedded separately, by any number of
+    vector stores. Only files that were added or changed since the store was last written are chunked again, the
+    chunks of unchanged files are copied over from the old store"""
+    if not is_git_dir(root_dir):
+        raise ValueError(f"{root_dir} is not a valid git root directory")
+
+    run_report = run_report if run_report is not None else RunReport()
+    chunk_settings = chunk_settings if chunk_settings is not None else ChunkSettings()
+    settings = chunk_settings.to_dict()
+    old_store = ChunkStore.open(store_path)
+    if old_store is not None and old_store.settings != settings:
+        old_store.close()
+        old_store = None
+    old_manifest = Manifest(old_store.records(), settings, old_store.commit_sha, old_store.dirty_paths) \
+        if old_store else Manifest(settings=settings)
+
+    manifest_diff = diff_repo(root_dir, old_manifest, use_git and old_store is not None, exclude_patterns,
+                              file_source, include_untracked, file_guards, run_report)
+    logger.info(f"{len(manifest_diff.added)} files added, {len(manifest_diff.changed)} changed, "
+                f"{len(manifest_diff.deleted)} deleted and {len(manifest_diff.unchanged)} unchanged since the chunk "
+                f"store was written.")
+    require_grammars(os.path.splitext(file_path)[1] for file_path in manifest_diff.added + manifest_diff.changed)
+
+    writer = ChunkStoreWriter(store_path, settings, *get_git_state(root_dir))
+    try:
+        files_to_chunk = manifest_diff.added + manifest_diff.changed
+        # with use_git unchanged files are not listed in the diff, only carried over in its records
+        skip = set(files_to_chunk)
+        for file_path, record in manifest_diff.records.items():
+            if file_path not in skip:
+                writer.add_file(file_path, record, old_store.file_chunks(file_path))
+
+        files = [file_properties_from_path(file_path) for file_path in files_to_chunk]
+        for file, chunks in split_files(files, chunk_settings, workers, run_report, summary_cache=summary_cache):
+            # failed files are left out of the store so they are retried on the next run
+            if chunks is not None:
+                file_path = os.path.join(file.dir_path, file.file_name)
+                writer.add_file(file_path, manifest_diff.records[file_path], chunks)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if old_store is not None:
+            old_store.close()
+
+    writer.commit()
+    logger.info(f"{writer.num_chunks} chunks of {len(writer.files)} files stored in {store_path}.")
+    return ChunkStore.open(store_path)
+
+
+def embed_chunk_store(
+        store_path: str,
+        embedding_type,
+        vs_path: str,
+        batch_size: int = 1000,
+        scheduler: Optional[EmbeddingScheduler] = None,
+        resume: bool = False,
+        run_report: Optional[RunReport] = None
+):
+    """Embed the chunks of a chunk store into a vector store without touching the repo. Only the files whose chunks
+    changed since the vector store was last updated are embedded"""
+    store = ChunkStore.open(store_path)
+    if store is None:
+        raise ValueError(f"No chunk store found at {store_path}, run with --chunk first!")
+
+    def diff_files(old_manifest: Manifest, rebuild: bool) -> ManifestDiff:
+        return old_manifest.diff_records(store.records())
+
+    def load_batches() -> Iterator[List[Tuple[FileProperties, Optional[ChunkBatch]]]]:
+        batch = []
+        num_chunks = 0
+        for file_path in files_to_index:
+            with run_report.stage("load") as stats:
+                chunks = store.file_chunks(file_path)
+                stats.files = 1
+                stats.chunks = len(chunks)
+            batch.append((file_properties_from_path(file_path), chunks))
+            num_chunks += len(chunks)
+            if num_chunks >= batch_size:
+                yield batch
+                batch = []
+                num_chunks = 0
+        if batch:
+            yield batch
+
+    run_report = run_report if run_report is not None else RunReport()
+    try:
+        vs, checkpoint, records, files_to_index = plan_index(vs_path, embedding_type, store.settings, diff_files,
+                                                             store.commit_sha, resume, store.dirty_paths)
+        return run_index(vs, vs_path, embedding_type, checkpoint, records, batch_files(load_batches(), records),
+                         scheduler, run_report)
+    finally:
+        store.close()
+
+
+def index_repos(
+        repos: List[dict],
+        embedding_type,
+        workers: int = 1,
+        use_git: bool = False,
+        scheduler: Optional[EmbeddingScheduler] = None,
+        resume: bool = False,
+        run_report: Optional[RunReport] = None
+) -> List[str]:
+    """Index several repos in one process, each into its own vector store. repos holds the update_index arguments of
+    each repo (root_dir, vs_path and its chunk and crawler settings). All repos share one pool of workers, one
+    embedding scheduler and one set of loaded grammars, so none of these are set up again per repo. A repo that fails
+    to index is logged and skipped. Returns the root directories of the repos that failed"""
+    scheduler = scheduler if scheduler is not None else EmbeddingScheduler(embedding_type)
+
+    failed = []
+    # every worker loads the tokenizer once if any repo needs it, splitters and parsers are set up on first use for each
+    # repo
+    needs_tokenizer = any(repo.get("chunk_settings", ChunkSettings()).chunk_unit == "tokens" for repo in repos)
+    with process_pool(workers, initializer=get_tokenizer if needs_tokenizer else None) as executor:
+        with tqdm(total=len(repos), desc='Indexing repos...', ncols=80) as pbar:
+            for repo in repos:
+                repo = dict(repo, workers=workers)
+                pbar.set_postfix_str(os.path.basename(repo["root_dir"].rstrip(os.sep)))
+                try:
+                    update_index(embedding_type=embedding_type, use_git=use_git, scheduler=scheduler, resume=resume,
+                                 run_report=run_report, executor=executor, **repo)
+                except Exception as e:
+                    logger.error(f"Error indexing repo {repo['root_dir']}. Skipping repo. {e}")
+                    failed.append(repo["root_dir"])
+                pbar.update()
+
+    logger.info(f"{len(repos) - len(failed)} of {len(repos)} repos indexed.")
+    return failed
+
+
+def remove_shard(vs_path: str, shard: str):
+    """Delete the vector store, manifest and checkpoint of a shard that no longer has any files"""
+    shard_path = shard_vs_path(vs_path, shard)
+    if os.path.exists(shard_path):
+        DeepLake.force_delete_by_path(shard_path)
+    for path in (manifest_path(shard_path), checkpoint_path(shard_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def update_sharded_index(
+        root_dir: str,
+        embedding_type,
+        vs_path: str,
+        shard_by: str = "directory",
+        num_shards: int = 1,
+        shard_workers: int = 4,
+        chunk_settings: Optional[ChunkSettings] = None,
+        workers: int = 1,
+        batch_size: int = 1000,
+        exclude_patterns: Optional[List[str]] = None,
+        file_source: str = "walk",
+        include_untracked: bool = False,
+        file_guards: Optional[FileGuards] = None,
+        scheduler: Optional[EmbeddingScheduler] = None,
+        resume: bool = False,
+        run_report: Optional[RunReport] = None,
+        summary_cache: Optional[SummaryCache] = None
+) -> List[str]:
+    """Index a repo into several vector stores under vs_path, one per shard of the layout given by shard_by and
+    num_shards. The repo is listed once and every shard is compared against its own manifest, so only shards whose
+    files changed are re-indexed. Up to shard_workers shards are indexed at once, chunking their files on one shared
+    pool of workers and embedding them through one scheduler. Shards left without files are deleted. Returns the
+    shards that failed to index, they keep their checkpoint and are picked up again by the next run"""
+    if not is_git_dir(root_dir):
+        raise ValueError(f"{root_dir} is not a valid git root directory")
+
+    run_report = run_report if run_report is not None else RunReport()
+    scheduler = scheduler if scheduler is not None else EmbeddingScheduler(embedding_type)
+    chunk_settings = chunk_settings if chunk_settings is not None else ChunkSettings()
+    layout = ShardLayout(shard_by, num_shards)
+    settings = {**chunk_settings.to_dict(), **layout.settings()}
+
+    with run_report.stage("walk") as stats:
+        filtered_files = filter_files(root_dir, exclude_patterns, file_source=file_source,
+                                      include_untracked=include_untracked, file_guards=file_guards)
+        stats.files = len(filtered_files)
+    file_paths = [os.path.join(ff.dir_path, ff.file_name) for ff in filtered_files]
+    blob_shas = {file_path: ff.blob_sha for file_path, ff in zip(file_paths, filtered_files) if ff.blob_sha}
+    shard_files = layout.group(root_dir, file_paths)
+    layout.shards = list(shard_files)
+    commit_sha = get_head_sha(root_dir)
+
+    def index_shard(shard: str, executor: Optional[Executor]):
+        shard_path = shard_vs_path(vs_path, shard)
+
+        def diff_files(old_manifest: Manifest, rebuild: bool) -> ManifestDiff:
+            return old_manifest.diff(shard_files[shard], blob_shas)
+
+        vs, checkpoint, records, files_to_index = plan_index(shard_path, embedding_type, settings, diff_files,
+                                                             commit_sha, resume)
+        files = [file_properties_from_path(file_path) for file_path in files_to_index]
+        batches = iter_split_batches(files, chunk_settings, workers, batch_size, run_report, executor, summary_cache)
+        run_index(vs, shard_path, embedding_type, checkpoint, records, batch_files(batches, records), scheduler,
+                  run_report)
+
+    require_grammars(os.path.splitext(file_path)[1] for file_path in file_paths)
+
+    failed = []
+    os.makedirs(vs_path, exist_ok=True)
+    initializer = get_tokenizer if chunk_settings.chunk_unit == "tokens" else None
+    with process_pool(workers, initializer=initializer) as executor, \
+            ThreadPoolExecutor(max_workers=shard_workers) as shard_executor:
+        futures = {shard_executor.submit(index_shard, shard, executor): shard for shard in layout.shards}
+        with tqdm(total=len(futures), desc='Indexing shards...', ncols=80) as pbar:
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error indexing shard {futures[future]}. Run again to retry it. {e}")
+                    failed.append(futures[future])
+                pbar.update()
+
+    # shards that have never been indexed successfully have no store to search yet
+    layout.shards = [shard for shard in layout.shards if os.path.exists(manifest_path(shard_vs_path(vs_path, shard)))]
+    # readers switch to the new layout before the shards it no longer has are deleted
+    old_layout = ShardLayout.load(shard_layout_path(vs_path))
+    layout.save(shard_layout_path(vs_path))
+    for shard in old_layout.shards if old_layout is not None else []:
+        if shard not in shard_files:
+            remove_shard(vs_path, shard)
+
+    logger.info(f"{len(shard_files) - len(failed)} of {len(shard_files)} shards indexed.")
+    return failed
@@ -0,0 +1,69 @@
+from langchain_core.embeddings import Embeddings
+from array import array
+from repogpt.lru_store import LruStore
+from typing import Callable, Dict, List
+import hashlib
+import os
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Name identifying the model behind an embeddings object, so vectors from different models are never mixed up"""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.model
+    model = getattr(embeddings, 'model', None) or getattr(embeddings, 'model_name', None) or ''
+    return f"{type(embeddings).__name__}:{model}"
+
+
+def hash_text(text: str) -> bytes:
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    """On-disk SQLite cache of embedding vectors keyed by (model name, text hash). When the cache grows past
+    max_size_mb the least recently used vectors are evicted"""
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 1024):
+        self.store = LruStore(os.path.join(cache_dir, 'embeddings.sqlite'), "embeddings",
+                              ("model", "text_hash", "vector"), max_size_mb)
+
+    def get_many(self, model: str, text_hashes: List[bytes]) -> Dict[bytes, List[float]]:
+        """Look up the cached vectors for text hashes, hashes that are not cached are left out of the result"""
+        return {text_hash: array('f', vector).tolist()
+                for text_hash, vector in self.store.get_many(model, text_hashes).items()}
+
+    def put_many(self, model: str, vectors: Dict[bytes, List[float]]):
+        """Store vectors for text hashes, then evict the least recently used vectors if the cache is too big"""
+        self.store.put_many(model, {text_hash: array('f', vector).tobytes() for text_hash, vector in vectors.items()})
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts that are not in the embedding cache to the underlying embeddings"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = embedding_model_name(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        text_hashes = [hash_text(text) for text in texts]
+        vectors = self.cache.get_many(self.model, list(set(text_hashes)))
+
+        # identical texts are only embedded once
+        missing = {text_hash: text for text_hash, text in zip(text_hashes, texts) if text_hash not in vectors}
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[text_hash] for text_hash in text_hashes]
+
+    def wrap_requests(self, wrapper: Callable[[Embeddings], Embeddings]) -> 'CachedEmbeddings':
+        """The same cache in front of the underlying embeddings wrapped by wrapper, which only sees the texts that miss
+        the cache"""
+        embeddings = CachedEmbeddings(wrapper(self.embeddings), self.cache)
+        embeddings.model = self.model
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+from repogpt.run_report import RunReport
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger("repogpt_crawler_logger")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Rate limiter that hands out tokens_per_minute tokens per minute, refilled continuously"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.tokens = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        """Block until the tokens are available. A request larger than the whole budget waits for a full bucket"""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedEmbeddings:
+    """Embeddings wrapper that charges the texts of every request against a token bucket before sending it"""
+
+    def __init__(self, embeddings, token_bucket: TokenBucket, count_tokens: Callable[[str], int] = estimate_tokens):
+        self.embeddings = embeddings
+        self.token_bucket = token_bucket
+        self.count_tokens = count_tokens
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.token_bucket.acquire(sum(self.count_tokens(text) for text in texts))
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class EmbeddingScheduler:
+    """Embeds texts in request batches of batch_size on a thread pool with at most max_in_flight requests running at
+    once across every embed call sharing the scheduler, optionally within a tokens_per_minute budget that is only
+    charged for texts a cache in front of the embeddings does not answer. Failed requests are retried with jittered
+    exponential backoff and results are handed back in the order they were submitted"""
+
+    def __init__(
+            self,
+            embeddings,
+            batch_size: int = 100,
+            max_in_flight: int = 4,
+            tokens_per_minute: int = 0,
+            max_retries: int = 6,
+            base_delay: float = 1.0,
+            max_delay: float = 60.0,
+            count_tokens: Callable[[str], int] = estimate_tokens
+    ):
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        # shards and repos indexed at once each call embed, the cap holds for all of them together
+        self.request_slots = threading.BoundedSemaphore(max_in_flight)
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        if self.token_bucket:
+            # only texts that are actually sent are charged, so the limit goes behind any cache in front of the API
+            rate_limit = partial(RateLimitedEmbeddings, token_bucket=self.token_bucket, count_tokens=count_tokens)
+            wrap_requests = getattr(embeddings, 'wrap_requests', None)
+            embeddings = wrap_requests(rate_limit) if wrap_requests else rate_limit(embeddings)
+        self.embeddings = embeddings
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.run_report = RunReport()
+
+    def embed_request(self, texts: List[str]) -> List[List[float]]:
+        """Embed one request batch, retrying with full jitter backoff"""
+        attempt = 0
+        while True:
+            try:
+                with self.request_slots, self.run_report.stage("embed") as stats:
+                    vectors = self.embeddings.embed_documents(texts)
+                    stats.chunks = len(texts)
+                    stats.bytes = sum(len(text) for text in texts)
+                return vectors
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                logger.warning(f"Embedding request of {len(texts)} texts failed, retrying in {delay:.1f}s. {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def embed(self, groups: Iterable[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, List[List[float]]]]:
+        """Embed the texts of each (payload, texts) group and yield (payload, vectors) in the order the groups came in.
+        Groups are read ahead only as far as needed to keep max_in_flight requests busy"""
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = deque()
+            num_pending_requests = 0
+            for payload, texts in groups:
+                requests = [executor.submit(self.embed_request, texts[start:start + self.batch_size])
+                            for start in range(0, len(texts), self.batch_size)]
+                pending.append((payload, requests))
+                num_pending_requests += len(requests)
+
+                while pending and num_pending_requests - len(pending[0][1]) >= self.max_in_flight:
+                    num_pending_requests -= len(pending[0][1])
+                    yield self._collect(pending.popleft())
+
+            while pending:
+                yield self._collect(pending.popleft())
+
+    @staticmethod
+    def _collect(group: Tuple[Any, list]) -> Tuple[Any, List[List[float]]]:
+        payload, requests = group
+        vectors = []
+        for request in requests:
+            vectors.extend(request.result())
+        return payload, vectors
@@ -0,0 +1,49 @@
+from typing import List, Optional
+import os
+
+DEFAULT_GENERATED_MARKERS = ["@generated", "do not edit", "auto-generated", "autogenerated"]
+
+
+class FileGuards:
+    """Cheap checks that keep huge, binary, minified and generated files out of the index. Apart from the file size
+    they only look at the first sniff_bytes of a file. A limit of 0 disables that check"""
+
+    def __init__(
+            self,
+            max_file_size: int = 1_000_000,
+            max_avg_line_length: int = 250,
+            max_line_length: int = 5000,
+            generated_markers: Optional[List[str]] = None,
+            marker_lines: int = 10,
+            sniff_bytes: int = 8192
+    ):
+        self.max_file_size = max_file_size
+        self.max_avg_line_length = max_avg_line_length
+        self.max_line_length = max_line_length
+        self.generated_markers = [marker.lower() for marker in (
+            DEFAULT_GENERATED_MARKERS if generated_markers is None else generated_markers)]
+        self.marker_lines = marker_lines
+        self.sniff_bytes = sniff_bytes
+
+    def skip_reason(self, file_path: str) -> Optional[str]:
+        """Reason the file should not be indexed, or None if it should be"""
+        size = os.stat(file_path).st_size
+        if self.max_file_size and size > self.max_file_size:
+            return "files too large"
+
+        with open(file_path, 'rb') as f:
+            prefix = f.read(self.sniff_bytes)
+        if b'\0' in prefix:
+            return "binary files"
+
+        lines = prefix.split(b'\n')
+        if self.max_line_length and max(len(line) for line in lines) > self.max_line_length:
+            return "minified files"
+        if self.max_avg_line_length and len(prefix) / len(lines) > self.max_avg_line_length:
+            return "minified files"
+
+        header = b'\n'.join(lines[:self.marker_lines]).decode('utf-8', errors='replace').lower()
+        if any(marker in header for marker in self.generated_markers):
+            return "generated files"
+
+        return None
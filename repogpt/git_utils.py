@@ -0,0 +1,78 @@
+from typing import List, Optional, Tuple
+import os
+import subprocess
+
+
+def run_git(repo_dir: str, *args: str) -> str:
+    """Run a git command in the repo and return its stdout"""
+    result = subprocess.run(["git", "-C", repo_dir, *args], check=True, capture_output=True, text=True)
+    return result.stdout
+
+
+def split_nul(output: str) -> List[str]:
+    """Split the output of a git command run with -z"""
+    return [entry for entry in output.split('\0') if entry]
+
+
+def list_files(repo_dir: str, include_untracked: bool = False) -> List[Tuple[str, Optional[str]]]:
+    """Get the paths of the files tracked in the git index with their blob shas, without walking the file system. The
+    blob sha is None when it does not describe the working tree copy: modified, conflicted and untracked files"""
+    modified = set(split_nul(run_git(repo_dir, "ls-files", "--modified", "-z")))
+    deleted = set(split_nul(run_git(repo_dir, "ls-files", "--deleted", "-z")))
+
+    files = {}
+    for entry in split_nul(run_git(repo_dir, "ls-files", "--stage", "-z")):
+        info, rel_path = entry.split('\t', 1)
+        mode, blob_sha, stage = info.split(' ')
+        # skip submodules and files deleted from the working tree
+        if mode == '160000' or rel_path in deleted:
+            continue
+        files[rel_path] = None if rel_path in files or rel_path in modified or stage != '0' else blob_sha
+
+    if include_untracked:
+        for rel_path in split_nul(run_git(repo_dir, "ls-files", "--others", "--exclude-standard", "-z")):
+            files[rel_path] = None
+
+    return [(os.path.join(repo_dir, rel_path), blob_sha) for rel_path, blob_sha in files.items()]
+
+
+def get_head_sha(repo_dir: str) -> Optional[str]:
+    """Get the commit sha of HEAD, returns None if the repo has no commits yet"""
+    try:
+        return run_git(repo_dir, "rev-parse", "--verify", "HEAD").strip()
+    except subprocess.CalledProcessError:
+        return None
+
+
+def list_tracked_files(repo_dir: str, file_paths: List[str]) -> List[str]:
+    """Get which of the given paths are tracked in the git index"""
+    if not file_paths:
+        return []
+    rel_paths = [os.path.relpath(file_path, repo_dir) for file_path in file_paths]
+    output = run_git(repo_dir, "--literal-pathspecs", "ls-files", "-z", "--", *rel_paths)
+    return [os.path.join(repo_dir, rel_path) for rel_path in split_nul(output)]
+
+
+def get_changed_files(
+        repo_dir: str,
+        since_sha: str,
+        include_untracked: bool = True
+) -> Tuple[List[str], List[str]]:
+    """Get the paths of files that were added or modified and the paths of files that were deleted between a commit and
+    the current working tree, optionally including untracked files that are not ignored"""
+    # diffing a commit against the working tree covers both new commits and uncommitted changes in one call
+    entries = split_nul(run_git(repo_dir, "diff", "--name-status", "--no-renames", "-z", since_sha))
+
+    changed, deleted = [], []
+    for status, rel_path in zip(entries[::2], entries[1::2]):
+        file_path = os.path.join(repo_dir, rel_path)
+        if status == 'D':
+            deleted.append(file_path)
+        else:
+            changed.append(file_path)
+
+    if include_untracked:
+        untracked = split_nul(run_git(repo_dir, "ls-files", "--others", "--exclude-standard", "-z"))
+        changed.extend(os.path.join(repo_dir, rel_path) for rel_path in untracked)
+
+    return changed, deleted
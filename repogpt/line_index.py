@@ -0,0 +1,27 @@
+from bisect import bisect_left
+import re
+
+NEWLINE_PATTERN = re.compile('\n')
+
+
+class LineIndex:
+    """Index of the newline positions in a text so character offsets can be mapped to line numbers by binary search
+    instead of rescanning the text for every lookup"""
+
+    def __init__(self, text: str):
+        self.newline_offsets = [match.start() for match in NEWLINE_PATTERN.finditer(text)]
+
+    def line_number(self, offset: int) -> int:
+        """1-based line number of the character at offset"""
+        return bisect_left(self.newline_offsets, offset) + 1
+
+    def num_lines(self) -> int:
+        return len(self.newline_offsets) + 1
+
+    def line_offset(self, line: int) -> int:
+        """Character offset of the start of a 1-based line, lines past the end map to the end of the text"""
+        if line <= 1:
+            return 0
+        if line - 2 >= len(self.newline_offsets):
+            return self.newline_offsets[-1] + 1 if self.newline_offsets else 0
+        return self.newline_offsets[line - 2] + 1
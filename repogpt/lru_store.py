@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+# stay well below SQLite's limit on the number of query parameters
+MAX_QUERY_PARAMETERS = 500
+# connections inherited from a parent process are never used or closed, closing one could checkpoint and delete the
+# WAL the parent is still writing to
+_inherited_connections = []
+
+
+class LruStore:
+    """On-disk SQLite table of blobs keyed by (namespace, key). When the blobs grow past max_size_mb the least recently
+    used ones are evicted. Several processes can share a store, a process forked from one holding the store opens its
+    own connection. Hits are recorded in memory and written with the next put, or once touch_batch of them have piled
+    up, so lookups do not write to the database every time and last_used is only approximate"""
+
+    def __init__(
+            self,
+            path: str,
+            table: str,
+            columns: Tuple[str, str, str],
+            max_size_mb: int,
+            touch_batch: int = 256
+    ):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.table = table
+        self.namespace_column, self.key_column, self.value_column = columns
+        self.max_size = max_size_mb * 1024 * 1024
+        self.touch_batch = touch_batch
+        self.connection = None
+        self._open()
+
+    def _open(self):
+        self.pid = os.getpid()
+        self.touched: Dict[Tuple[str, bytes], float] = {}
+        self.lock = threading.Lock()
+        # crawl workers write to the same store, wait for each other's transactions instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                                f"{self.namespace_column} TEXT NOT NULL, {self.key_column} BLOB NOT NULL, "
+                                f"{self.value_column} BLOB NOT NULL, last_used REAL NOT NULL, "
+                                f"UNIQUE ({self.namespace_column}, {self.key_column}))")
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)")
+        self.connection.commit()
+        self.size = self._stored_size()
+
+    def _check_process(self):
+        """Reopen the store in a forked process, SQLite connections must not be used across a fork"""
+        if self.pid != os.getpid():
+            _inherited_connections.append(self.connection)
+            self._open()
+
+    def _stored_size(self) -> int:
+        return self.connection.execute(
+            f"SELECT COALESCE(SUM(LENGTH({self.value_column})), 0) FROM {self.table}").fetchone()[0]
+
+    def _select(self, columns: str, namespace: str, keys: List[bytes]) -> List[tuple]:
+        rows = []
+        for start in range(0, len(keys), MAX_QUERY_PARAMETERS):
+            batch = keys[start:start + MAX_QUERY_PARAMETERS]
+            rows.extend(self.connection.execute(
+                f"SELECT {columns} FROM {self.table} WHERE {self.namespace_column} = ? "
+                f"AND {self.key_column} IN ({','.join('?' * len(batch))})", [namespace, *batch]))
+        return rows
+
+    def get_many(self, namespace: str, keys: List[bytes]) -> Dict[bytes, bytes]:
+        """Look up the values of keys, keys that are not stored are left out of the result"""
+        self._check_process()
+        with self.lock:
+            values = dict(self._select(f"{self.key_column}, {self.value_column}", namespace, keys))
+            now = time.time()
+            self.touched.update(((namespace, key), now) for key in values)
+            if len(self.touched) >= self.touch_batch:
+                self._write_touches()
+                self.connection.commit()
+        return values
+
+    def get(self, namespace: str, key: bytes) -> Optional[bytes]:
+        return self.get_many(namespace, [key]).get(key)
+
+    def put_many(self, namespace: str, values: Dict[bytes, bytes]):
+        """Store the values of keys, then evict the least recently used values if the store is too big"""
+        now = time.time()
+        self._check_process()
+        with self.lock:
+            # replaced values no longer take up space
+            replaced = self._select(f"LENGTH({self.value_column})", namespace, list(values))
+            self.size -= sum(size for size, in replaced)
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({self.namespace_column}, {self.key_column}, "
+                f"{self.value_column}, last_used) VALUES (?, ?, ?, ?)",
+                [(namespace, key, value, now) for key, value in values.items()])
+            self.size += sum(len(value) for value in values.values())
+            self._write_touches()
+            if self.size > self.max_size:
+                # other processes write to the store too, so only evict if it really is too big
+                self.size = self._stored_size()
+                if self.size > self.max_size:
+                    self._evict()
+            self.connection.commit()
+
+    def put(self, namespace: str, key: bytes, value: bytes):
+        self.put_many(namespace, {key: value})
+
+    def flush(self):
+        """Write the recorded hits to the database"""
+        self._check_process()
+        with self.lock:
+            self._write_touches()
+            self.connection.commit()
+
+    def _write_touches(self):
+        self.connection.executemany(
+            f"UPDATE {self.table} SET last_used = ? WHERE {self.namespace_column} = ? AND {self.key_column} = ?",
+            [(last_used, namespace, key) for (namespace, key), last_used in self.touched.items()])
+        self.touched.clear()
+
+    def _evict(self):
+        # evict down to 90% of the maximum size so eviction does not run again on every put
+        target = self.max_size * 0.9
+        stale_rows = []
+        rows = self.connection.execute(
+            f"SELECT rowid, LENGTH({self.value_column}) FROM {self.table} ORDER BY last_used, rowid")
+        for rowid, size in rows:
+            if self.size <= target:
+                break
+            stale_rows.append((rowid,))
+            self.size -= size
+        self.connection.executemany(f"DELETE FROM {self.table} WHERE rowid = ?", stale_rows)
@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(vs_path: str) -> str:
+    """Location of the manifest that sits next to the vector store"""
+    return f"{vs_path.rstrip(os.sep)}.manifest.json"
+
+
+def hash_contents(contents: bytes) -> str:
+    """Hash file contents the same way git hashes blobs so the hashes can be compared against git object ids"""
+    hasher = hashlib.sha1(f"blob {len(contents)}\0".encode())
+    hasher.update(contents)
+    return hasher.hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Hash the contents of a file on disk"""
+    with open(file_path, 'rb') as f:
+        return hash_contents(f.read())
+
+
+class FileRecord:
+
+    def __init__(self, size: int, mtime_ns: int, content_hash: str, chunk_ids: Optional[List[str]] = None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.chunk_ids = chunk_ids or []
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "hash": self.content_hash, "chunk_ids": self.chunk_ids}
+
+    @staticmethod
+    def from_dict(record: dict) -> 'FileRecord':
+        return FileRecord(record["size"], record["mtime_ns"], record["hash"], record.get("chunk_ids"))
+
+
+class ManifestDiff:
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.deleted = []
+        # up to date records for every file that still exists, chunk ids are carried over for unchanged files only
+        self.records = {}
+
+    def stale_chunk_ids(self, manifest: 'Manifest') -> List[str]:
+        """Chunk ids in the vector store that belong to changed or deleted files"""
+        stale_ids = []
+        for file_path in self.changed + self.deleted:
+            stale_ids.extend(manifest.records[file_path].chunk_ids)
+        return stale_ids
+
+
+class Manifest:
+
+    def __init__(
+            self,
+            records: Optional[Dict[str, FileRecord]] = None,
+            settings: Optional[dict] = None,
+            commit_sha: Optional[str] = None,
+            dirty_paths: Optional[List[str]] = None
+    ):
+        self.records = records or {}
+        self.settings = settings or {}
+        # commit of the repo when it was last indexed
+        self.commit_sha = commit_sha
+        # files whose indexed contents were not those of the commit: uncommitted changes and untracked files
+        self.dirty_paths = dirty_paths or []
+
+    @staticmethod
+    def load(path: str) -> Optional['Manifest']:
+        """Load a manifest from disk, returns None if there is no manifest or it was written by another version"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            contents = json.load(f)
+        if contents.get("version") != MANIFEST_VERSION:
+            return None
+        records = {file_path: FileRecord.from_dict(record) for file_path, record in contents["files"].items()}
+        return Manifest(records, contents.get("settings"), contents.get("commit_sha"), contents.get("dirty_paths"))
+
+    def save(self, path: str):
+        """Atomically write the manifest to disk"""
+        contents = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "commit_sha": self.commit_sha,
+            "dirty_paths": [file_path for file_path in self.dirty_paths if file_path in self.records],
+            "files": {file_path: record.to_dict() for file_path, record in self.records.items()}
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(contents, f)
+        os.replace(tmp_path, path)
+
+    def _diff_file(self, file_path: str, manifest_diff: ManifestDiff, content_hash: Optional[str] = None):
+        """Classify a file on disk against its record. Files are only hashed when their size or mtime has changed and
+        no content hash is already known for them"""
+        stat = os.stat(file_path)
+        record = self.records.get(file_path)
+
+        if record and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+            manifest_diff.unchanged.append(file_path)
+            manifest_diff.records[file_path] = record
+            return
+
+        content_hash = content_hash or hash_file(file_path)
+        if record is None:
+            manifest_diff.added.append(file_path)
+            manifest_diff.records[file_path] = FileRecord(stat.st_size, stat.st_mtime_ns, content_hash)
+        elif record.content_hash == content_hash:
+            # touched but not modified
+            manifest_diff.unchanged.append(file_path)
+            manifest_diff.records[file_path] = FileRecord(stat.st_size, stat.st_mtime_ns, content_hash,
+                                                          record.chunk_ids)
+        else:
+            manifest_diff.changed.append(file_path)
+            manifest_diff.records[file_path] = FileRecord(stat.st_size, stat.st_mtime_ns, content_hash)
+
+    def diff(self, file_paths: List[str], content_hashes: Optional[Dict[str, str]] = None) -> ManifestDiff:
+        """Compare every file that should be indexed against the manifest. Content hashes that are already known, such
+        as git blob shas, are used instead of hashing the files again"""
+        content_hashes = content_hashes or {}
+        manifest_diff = ManifestDiff()
+        for file_path in file_paths:
+            self._diff_file(file_path, manifest_diff, content_hashes.get(file_path))
+
+        seen = set(file_paths)
+        manifest_diff.deleted = [file_path for file_path in self.records if file_path not in seen]
+        return manifest_diff
+
+    def diff_changed(self, changed_paths: List[str], deleted_paths: List[str]) -> ManifestDiff:
+        """Compare only the files known to have changed against the manifest, every other record is carried over"""
+        manifest_diff = ManifestDiff()
+        manifest_diff.records = dict(self.records)
+        for file_path in changed_paths:
+            self._diff_file(file_path, manifest_diff)
+
+        manifest_diff.deleted = [file_path for file_path in dict.fromkeys(deleted_paths) if file_path in self.records]
+        for file_path in manifest_diff.deleted:
+            del manifest_diff.records[file_path]
+        return manifest_diff
+
+    def diff_records(self, records: Dict[str, FileRecord]) -> ManifestDiff:
+        """Compare records that already hold content hashes and chunk ids, such as those of a chunk store, against the
+        manifest. A file is unchanged when both its contents and its chunks are the same"""
+        manifest_diff = ManifestDiff()
+        for file_path, record in records.items():
+            old_record = self.records.get(file_path)
+            if old_record is None:
+                manifest_diff.added.append(file_path)
+                manifest_diff.records[file_path] = FileRecord(record.size, record.mtime_ns, record.content_hash)
+            elif old_record.content_hash != record.content_hash or old_record.chunk_ids != record.chunk_ids:
+                manifest_diff.changed.append(file_path)
+                manifest_diff.records[file_path] = FileRecord(record.size, record.mtime_ns, record.content_hash)
+            else:
+                manifest_diff.unchanged.append(file_path)
+                manifest_diff.records[file_path] = old_record
+
+        manifest_diff.deleted = [file_path for file_path in self.records if file_path not in records]
+        return manifest_diff
@@ -0,0 +1,124 @@
+from tree_sitter import Language
+from importlib.metadata import version
+from typing import Dict, List, Optional
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sysconfig
+import tempfile
+import threading
+
+GRAMMAR_BUNDLE_VERSION = 1
+# environment variable pointing at the grammar bundle, inherited by crawl workers
+GRAMMAR_BUNDLE_ENV = "REPOGPT_GRAMMAR_BUNDLE"
+
+# language name -> (grammar repo, directory of the grammar in the repo, symbol name in the compiled library)
+GRAMMAR_SOURCES = {
+    "python": ("https://github.com/tree-sitter/tree-sitter-python", "", "python"),
+    "java": ("https://github.com/tree-sitter/tree-sitter-java", "", "java"),
+    "cpp": ("https://github.com/tree-sitter/tree-sitter-cpp", "", "cpp"),
+    "go": ("https://github.com/tree-sitter/tree-sitter-go", "", "go"),
+    "rust": ("https://github.com/tree-sitter/tree-sitter-rust", "", "rust"),
+    "ruby": ("https://github.com/tree-sitter/tree-sitter-ruby", "", "ruby"),
+    "php": ("https://github.com/tree-sitter/tree-sitter-php", "php", "php"),
+    "c-sharp": ("https://github.com/tree-sitter/tree-sitter-c-sharp", "", "c_sharp"),
+    "tsx": ("https://github.com/tree-sitter/tree-sitter-typescript", "tsx", "tsx"),
+}
+
+
+def default_bundle_path() -> str:
+    """Location of the grammar bundle, versioned so an incompatible bundle is never picked up by mistake"""
+    return os.environ.get(GRAMMAR_BUNDLE_ENV) or \
+        os.path.join(os.path.expanduser("~"), ".cache", "repogpt", f"grammars-v{GRAMMAR_BUNDLE_VERSION}")
+
+
+def bundle_target() -> dict:
+    """The tree-sitter version and platform compiled grammars are tied to"""
+    return {"tree_sitter": version("tree-sitter"), "platform": sysconfig.get_platform()}
+
+
+class GrammarBundle:
+    """Directory of prebuilt tree-sitter grammars described by a manifest.json. Opening a bundle only reads its
+    manifest, the shared library of a language is loaded the first time that language is asked for"""
+
+    def __init__(self, path: str, libraries: Dict[str, dict]):
+        self.path = path
+        self.libraries = libraries
+        self.languages: Dict[str, Language] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def open(path: str) -> Optional['GrammarBundle']:
+        """Open a grammar bundle, returns None if there is none. Raises if it was built for another tree-sitter version
+        or platform, as its grammars cannot be loaded"""
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != GRAMMAR_BUNDLE_VERSION:
+            return None
+        target = bundle_target()
+        if {key: manifest.get(key) for key in target} != target:
+            raise ValueError(f"Grammar bundle at {path} was built for tree-sitter {manifest.get('tree_sitter')} on "
+                             f"{manifest.get('platform')} but tree-sitter {target['tree_sitter']} on "
+                             f"{target['platform']} is in use, rebuild it with python -m repogpt.parsers.grammars")
+        return GrammarBundle(path, manifest["languages"])
+
+    def language(self, name: str) -> Language:
+        """The grammar of a language, loaded from its shared library on first use"""
+        language = self.languages.get(name)
+        if language is None:
+            with self.lock:
+                language = self.languages.get(name)
+                if language is None:
+                    if name not in self.libraries:
+                        raise ValueError(f"Grammar bundle at {self.path} has no {name} grammar!")
+                    library = self.libraries[name]
+                    language = Language(os.path.join(self.path, library["library"]), library["symbol"])
+                    self.languages[name] = language
+        return language
+
+
+def build_bundle(path: str, languages: Optional[List[str]] = None) -> GrammarBundle:
+    """Clone and compile grammars into a new bundle at path. This is the only step that needs network access and a C
+    compiler, loading the bundle afterwards needs neither"""
+    languages = languages or list(GRAMMAR_SOURCES)
+    tmp_path = f"{path.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    libraries = {}
+    with tempfile.TemporaryDirectory() as source_dir:
+        for name in languages:
+            repo, sub_dir, symbol = GRAMMAR_SOURCES[name]
+            repo_dir = os.path.join(source_dir, os.path.basename(repo))
+            if not os.path.exists(repo_dir):
+                subprocess.run(["git", "clone", "--depth", "1", repo, repo_dir], check=True)
+            revision = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, check=True, capture_output=True,
+                                      text=True).stdout.strip()
+            Language.build_library(os.path.join(tmp_path, f"{name}.so"), [os.path.join(repo_dir, sub_dir)])
+            libraries[name] = {"library": f"{name}.so", "symbol": symbol, "source": repo, "revision": revision}
+
+    manifest = {"version": GRAMMAR_BUNDLE_VERSION, **bundle_target(), "languages": libraries}
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return GrammarBundle(path, libraries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the tree-sitter grammar bundle RepoGPT parses files with')
+    parser.add_argument('path', nargs='?', default=default_bundle_path(), help='Directory to write the bundle to')
+    parser.add_argument('--languages', nargs='+', choices=list(GRAMMAR_SOURCES),
+                        help='Grammars to build, all by default')
+    args = parser.parse_args()
+    bundle = build_bundle(args.path, args.languages)
+    print(f"Built {len(bundle.libraries)} grammars into {bundle.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 from repogpt.parsers.treesitter import TreeSitterParser, FileSummary, SummaryPosition
 import ast
+import sys
 
 
 class PythonParser(TreeSitterParser):
+    # ast line numbers are 1-based
+    first_line = 1
+
+    @classmethod
+    def summary_cache_key(cls) -> str:
+        # the ast module comes with the interpreter
+        return f"{cls.__name__}:{cls.summary_version}:{sys.version_info[0]}.{sys.version_info[1]}"
 
     @staticmethod
     def get_file_summary(code: str, file_name:str) -> FileSummary:
@@ -0,0 +1,7 @@
+; classes and functions of C++, also used for javascript which is parsed with the cpp grammar
+; the parent of each name capture is the definition the name belongs to
+
+(class_specifier (type_identifier) @class.name)
+
+(function_declarator (identifier) @method.name)
+(function_declarator (field_identifier) @method.name)
@@ -0,0 +1,7 @@
+; types, methods and functions of Go
+; the parent of each name capture is the definition the name belongs to
+
+(type_spec (type_identifier) @class.name)
+
+(method_declaration (field_identifier) @method.name)
+(function_declaration (identifier) @method.name)
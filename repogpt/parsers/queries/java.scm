@@ -0,0 +1,7 @@
+; classes, constructors and methods of Java
+; the parent of each name capture is the definition the name belongs to
+
+(class_declaration (identifier) @class.name)
+
+(constructor_declaration (identifier) @method.name)
+(method_declaration (identifier) @method.name)
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-import subprocess
-from tree_sitter import Language, Parser
-from typing import List, Tuple
+from repogpt.parsers.grammars import GRAMMAR_BUNDLE_ENV, GrammarBundle, default_bundle_path
+from tree_sitter import Language, Parser, Query
+from typing import Iterable, List, Optional, Tuple
+import hashlib
+import os
+import threading
 
 
 class SummaryPosition:
@@ -23,37 +26,116 @@ class FileSummary:
         self.methods.append(SummaryPosition(method_name, method_start_line, method_end_line))
 
 
+# directory of the tree-sitter queries that find the classes and methods of each grammar
+QUERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'queries')
+CLASS_CAPTURE = 'class.name'
+METHOD_CAPTURE = 'method.name'
+
+
+def read_query(grammar: str) -> str:
+    """Source of the definitions query of a grammar"""
+    with open(os.path.join(QUERIES_DIR, f'{grammar}.scm'), 'r') as f:
+        return f.read()
+
+
 class TreeSitterParser(ABC):
-    languages = {}
+    bundle: Optional[GrammarBundle] = None
     loaded = False
+    # line number of the first line of a file in the summary positions, tree-sitter rows are 0-based
+    first_line = 0
+    # grammar the parser parses with, None for parsers that do not use tree-sitter
+    grammar: Optional[str] = None
+    # parsers set to each grammar and compiled definition queries, one per grammar for every thread
+    _parsers = threading.local()
+    # bump when a parser starts summarizing the same code differently, so cached summaries are not reused
+    summary_version = 1
 
     @staticmethod
     def initialize_treesitter():
-        # download tree-sitter shared objects according to
-        # https://github.com/sweepai/sweep/blob/b267b613d4c706eaf959fe6789f11e9a856521d1/sweepai/utils/utils.py#L169
-        LANGUAGE_NAMES = ["python", "java", "cpp", "go", "rust", "ruby", "php"]
-        for language in LANGUAGE_NAMES:
-            subprocess.run(
-                f"git clone https://github.com/tree-sitter/tree-sitter-{language} cache/tree-sitter-{language}",
-                shell=True)
-        for language in LANGUAGE_NAMES:
-            Language.build_library(f'cache/build/{language}.so', [f"cache/tree-sitter-{language}"])
-            subprocess.run(f"cp cache/build/{language}.so /tmp/{language}.so", shell=True)
-        TreeSitterParser.languages = {language: Language(f"/tmp/{language}.so", language) for language in
-                                      LANGUAGE_NAMES}
-        subprocess.run(f"git clone https://github.com/tree-sitter/tree-sitter-c-sharp cache/tree-sitter-c-sharp",
-                       shell=True)
-        Language.build_library(f'cache/build/c-sharp.so', [f"cache/tree-sitter-c-sharp"])
-        subprocess.run(f"cp cache/build/c-sharp.so /tmp/c-sharp.so", shell=True)
-        TreeSitterParser.languages["c-sharp"] = Language("/tmp/c-sharp.so", "c_sharp")
-
-        subprocess.run(f"git clone https://github.com/tree-sitter/tree-sitter-typescript cache/tree-sitter-typescript",
-                       shell=True)
-        Language.build_library(f'cache/build/typescript.so', [f"cache/tree-sitter-typescript/tsx"])
-        subprocess.run(f"cp cache/build/typescript.so /tmp/typescript.so", shell=True)
-        TreeSitterParser.languages["tsx"] = Language("/tmp/typescript.so", "tsx")
+        """Open the prebuilt grammar bundle. Only its manifest is read, each grammar is loaded when first used"""
+        bundle_path = default_bundle_path()
+        bundle = GrammarBundle.open(bundle_path)
+        if bundle is None:
+            raise ValueError(f"No tree-sitter grammar bundle found at {bundle_path}, build one with "
+                             f"python -m repogpt.parsers.grammars or set {GRAMMAR_BUNDLE_ENV} to its location!")
+        TreeSitterParser.bundle = bundle
         TreeSitterParser.loaded = True
 
+    @staticmethod
+    def get_language(name: str) -> Language:
+        """The grammar of a language, opening the grammar bundle first if needed"""
+        if not TreeSitterParser.loaded:
+            TreeSitterParser.initialize_treesitter()
+        return TreeSitterParser.bundle.language(name)
+
+    @staticmethod
+    def get_parser(grammar: str) -> Parser:
+        """A parser set to a grammar, reused by every file of that grammar parsed on the calling thread"""
+        parsers = getattr(TreeSitterParser._parsers, 'parsers', None)
+        if parsers is None:
+            parsers = TreeSitterParser._parsers.parsers = {}
+        parser = parsers.get(grammar)
+        if parser is None:
+            parser = Parser()
+            parser.set_language(TreeSitterParser.get_language(grammar))
+            parsers[grammar] = parser
+        return parser
+
+    @staticmethod
+    def get_query(grammar: str) -> Query:
+        """The definitions query of a grammar, compiled once on the calling thread"""
+        queries = getattr(TreeSitterParser._parsers, 'queries', None)
+        if queries is None:
+            queries = TreeSitterParser._parsers.queries = {}
+        query = queries.get(grammar)
+        if query is None:
+            query = queries[grammar] = TreeSitterParser.get_language(grammar).query(read_query(grammar))
+        return query
+
+    @staticmethod
+    def preload_parsers(grammars: Iterable[str]):
+        """Set up the parsers and queries of grammars on the calling thread ahead of the first file, for worker
+        initializers"""
+        for grammar in grammars:
+            TreeSitterParser.get_parser(grammar)
+            TreeSitterParser.get_query(grammar)
+
+    @classmethod
+    def summarize_definitions(cls, code: str) -> FileSummary:
+        """Parse code with the parser's grammar and run the grammar's definitions query over it. Every class.name and
+        method.name capture is the name of the definition that is its parent node"""
+        code_bytes = bytes(code, "utf-8")
+        tree = TreeSitterParser.get_parser(cls.grammar).parse(code_bytes)
+
+        file_summary = FileSummary()
+        for node, capture in TreeSitterParser.get_query(cls.grammar).captures(tree.root_node):
+            if capture == CLASS_CAPTURE:
+                positions = file_summary.classes
+            elif capture == METHOD_CAPTURE:
+                positions = file_summary.methods
+            else:
+                continue
+            name = code_bytes[node.start_byte:node.end_byte].decode('utf-8', errors='replace')
+            definition = node.parent
+            positions.append(SummaryPosition(name, definition.start_point[0], definition.end_point[0]))
+
+        # methods and classes are not in order so sort
+        file_summary.methods = sorted(file_summary.methods, key=lambda x: x.start_line)
+        file_summary.classes = sorted(file_summary.classes, key=lambda x: x.start_line)
+        return file_summary
+
+    @classmethod
+    def summary_cache_key(cls) -> str:
+        """Identifies the parser, grammar revision and query its summaries are made with"""
+        key = f"{cls.__name__}:{cls.summary_version}"
+        if cls.grammar:
+            if not TreeSitterParser.loaded:
+                TreeSitterParser.initialize_treesitter()
+            revision = TreeSitterParser.bundle.libraries.get(cls.grammar, {}).get("revision", "")
+            query_hash = hashlib.sha1(read_query(cls.grammar).encode('utf-8')).hexdigest()
+            key += f":{revision}:{query_hash}"
+        return key
+
     @staticmethod
     def get_summary_from_position(
             summary_positions: List[SummaryPosition],
@@ -0,0 +1,120 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional
+import queue
+import threading
+
+
+def _map_chunk(func: Callable, items: List) -> List:
+    return [func(item) for item in items]
+
+
+def ordered_map(
+        func: Callable,
+        items: List,
+        workers: int = 1,
+        chunksize: int = 1,
+        max_pending: int = 2,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        executor: Optional[Executor] = None
+) -> Iterator:
+    """Apply func to each item in a pool of worker processes and yield the results in the same order as items. At most
+    max_pending chunks per worker are in flight so results are never buffered faster than they are consumed. The
+    initializer is run once in each worker, or once in this process when running serially. An existing executor with
+    workers workers can be passed in to share one pool across calls, its workers are assumed to be initialized"""
+    if executor is not None:
+        yield from _ordered_submit(executor, func, items, workers, chunksize, max_pending)
+        return
+
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield func(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        yield from _ordered_submit(executor, func, items, workers, chunksize, max_pending)
+
+
+def _ordered_submit(executor: Executor, func: Callable, items: List, workers: int, chunksize: int,
+                    max_pending: int) -> Iterator:
+    pending = deque()
+    try:
+        for start in range(0, len(items), chunksize):
+            pending.append(executor.submit(_map_chunk, func, items[start:start + chunksize]))
+            if len(pending) >= workers * max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # a shared executor outlives this call, so drop the work nobody is going to collect
+        for future in pending:
+            future.cancel()
+
+
+@contextmanager
+def process_pool(workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()) -> Iterator:
+    """Pool of worker processes to share across several ordered_map calls, or None when running serially"""
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        yield executor
+
+
+class _PrefetchError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_PREFETCH_DONE = object()
+
+
+def prefetch(iterable: Iterable, max_pending: int = 2) -> Iterator:
+    """Consume an iterable in a background thread keeping up to max_pending items ready, so that producing the next
+    item overlaps with the caller processing the current one"""
+    items = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+            else:
+                put(_PREFETCH_DONE)
+        except BaseException as e:
+            put(_PrefetchError(e))
+        finally:
+            # make sure generators release their resources (e.g. worker pools) when the consumer stops early
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _PREFETCH_DONE:
+                break
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
@@ -1,6 +1,7 @@
 from langchain_community.vectorstores import DeepLake
 from langchain_community.llms import BaseLLM
 from langchain.docstore.document import Document
+from repogpt.chunk_context import render_chunk
 from typing import List
 from colorama import Fore, Back, Style, init
 import json
@@ -25,7 +26,7 @@ class QA:
 
     def create_prompt(self, query_str: str, similar_chunks: List[Document]) -> str:
         """Build the final prompt string using query and similar chunks"""
-        similar_chunk_str = '\n'.join([chunk.page_content for chunk in similar_chunks])
+        similar_chunk_str = '\n'.join([render_chunk(chunk.page_content, chunk.metadata) for chunk in similar_chunks])
         # TODO: Try structured json prompt
         final_prompt = f"You will be asked a question based on the following code snippets, \n {similar_chunk_str}\n " \
                        f"You may need to combine the above snippets according to their line numbers to answer the " \
@@ -34,7 +35,7 @@ class QA:
 
     def get_relevant_documents(self, query_str: str, documents: List[Document]) -> List[Document]:
 
-        chunk_dict = {index: value for index, value in enumerate([chunk.page_content for chunk in documents])}
+        chunk_dict = {index: render_chunk(chunk.page_content, chunk.metadata) for index, chunk in enumerate(documents)}
         chunk_json = json.dumps(chunk_dict)
         recursive_prompt = f"You will be given a json string where the keys are indexes and the values are snippets of " \
                            f"code from a repo with some contextual information above them. You will also be given a " \
@@ -0,0 +1,70 @@
+from langchain_community.vectorstores import DeepLake
+from langchain_core.embeddings import Embeddings
+from langchain.docstore.document import Document
+from repogpt.shards import ShardLayout, shard_layout_path, shard_vs_path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import heapq
+
+
+class QueryEmbeddings(Embeddings):
+    """Embeddings wrapper that embeds each query once no matter how many shards search it"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._embed_query = lru_cache(maxsize=128)(embeddings.embed_query)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_query(text)
+
+
+class ShardedDeepLake:
+    """Read-only view of a sharded index that searches every shard concurrently and merges their results"""
+
+    def __init__(self, shards: Dict[str, DeepLake], embedding: QueryEmbeddings, max_workers: int = 8):
+        self.shards = shards
+        self.embedding = embedding
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards))))
+
+    @staticmethod
+    def open(vs_path: str, embedding, max_workers: int = 8) -> Optional['ShardedDeepLake']:
+        """Open the shards of the index at vs_path, returns None if the index is not sharded"""
+        layout = ShardLayout.load(shard_layout_path(vs_path))
+        if layout is None:
+            return None
+        embedding = QueryEmbeddings(embedding)
+        return ShardedDeepLake({shard: DeepLake(dataset_path=shard_vs_path(vs_path, shard), read_only=True,
+                                                embedding=embedding)
+                                for shard in layout.shards}, embedding, max_workers)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        """The k chunks most similar to the query across all shards. Every shard returns its own top k and the merged
+        results are ranked by score, so the search_kwargs must use a similarity such as cos where higher is better"""
+        # embed the query up front so the shards all find it cached instead of racing to embed it
+        self.embedding.embed_query(query)
+        futures = [self.executor.submit(vs.similarity_search_with_score, query, k=k, **kwargs)
+                   for vs in self.shards.values()]
+        results = [result for future in futures for result in future.result()]
+        return heapq.nlargest(k, results, key=lambda result: result[1])
+
+    def as_retriever(self) -> 'ShardedRetriever':
+        return ShardedRetriever(self)
+
+
+class ShardedRetriever:
+    """Retriever over a sharded index with the search_kwargs and get_relevant_documents of a vector store retriever"""
+
+    def __init__(self, store: ShardedDeepLake):
+        self.store = store
+        self.search_kwargs = {}
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        search_kwargs = dict(self.search_kwargs)
+        k = search_kwargs.pop('k', 4)
+        # fetch_k only applies to maximal marginal relevance, which the fan-out does not use
+        search_kwargs.pop('fetch_k', None)
+        return [doc for doc, _ in self.store.similarity_search_with_score(query, k=k, **search_kwargs)]
@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak memory is reported as 0 there
+    resource = None
+
+
+def peak_rss_kb(who: int = 0) -> int:
+    """Peak resident set size of this process (or of its finished children) in KB"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if who else resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, linux reports KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class StageStats:
+    """Totals of one pipeline stage. CPU time is the CPU time of the threads that ran the stage"""
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.files = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.peak_rss_kb = 0
+
+    def merge(self, other: 'StageStats'):
+        self.calls += other.calls
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.files += other.files
+        self.chunks += other.chunks
+        self.bytes += other.bytes
+        self.peak_rss_kb = max(self.peak_rss_kb, other.peak_rss_kb)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "files": self.files,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "peak_rss_kb": self.peak_rss_kb
+        }
+
+
+class RunReport:
+    """Per-stage timings and counts of an indexing run, plus the top_n slowest files and the parser used for each
+    language. Reports of single files built in worker processes are merged into the report of the run"""
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.started = time.time()
+        self.stages: Dict[str, StageStats] = {}
+        self.parsers: Dict[str, Optional[str]] = {}
+        # min heap of (seconds, path, chunks, bytes) holding the slowest files seen so far
+        self.slowest_files = []
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Time a block of work as one call of a stage. The block fills in the file, chunk and byte counts of the
+        yielded stats"""
+        stats = StageStats()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield stats
+        finally:
+            stats.calls = 1
+            stats.wall_seconds = time.perf_counter() - wall
+            stats.cpu_seconds = time.thread_time() - cpu
+            stats.peak_rss_kb = peak_rss_kb()
+            self.add(name, stats)
+
+    def add(self, name: str, stats: StageStats):
+        with self.lock:
+            self.stages.setdefault(name, StageStats()).merge(stats)
+
+    def wall_seconds(self) -> float:
+        """Total wall time over all stages"""
+        return sum(stats.wall_seconds for stats in self.stages.values())
+
+    def record_file(self, path: str, seconds: float, chunks: int = 0, num_bytes: int = 0):
+        entry = (seconds, path, chunks, num_bytes)
+        with self.lock:
+            if len(self.slowest_files) < self.top_n:
+                heapq.heappush(self.slowest_files, entry)
+            elif entry > self.slowest_files[0]:
+                heapq.heapreplace(self.slowest_files, entry)
+
+    def merge(self, other: 'RunReport'):
+        """Add the stages and parsers of another report, typically the report of a file processed by a worker"""
+        for name, stats in other.stages.items():
+            self.add(name, stats)
+        with self.lock:
+            self.parsers.update(other.parsers)
+        for seconds, path, chunks, num_bytes in other.slowest_files:
+            self.record_file(path, seconds, chunks, num_bytes)
+
+    def to_dict(self) -> dict:
+        slowest_files: List[tuple] = sorted(self.slowest_files, reverse=True)
+        return {
+            "started": self.started,
+            "wall_seconds": round(time.time() - self.started, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "workers_peak_rss_kb": peak_rss_kb(who=1),
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "slowest_files": [{"path": path, "seconds": round(seconds, 6), "chunks": chunks, "bytes": num_bytes}
+                              for seconds, path, chunks, num_bytes in slowest_files],
+            "parsers": self.parsers
+        }
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
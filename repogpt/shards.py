@@ -0,0 +1,80 @@
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+
+SHARD_LAYOUT_VERSION = 1
+SHARD_MODES = ("none", "directory", "hash")
+# shard of the files at the top of the repo when sharding by directory
+ROOT_SHARD = "_root"
+
+
+def shard_layout_path(vs_path: str) -> str:
+    """Location of the shard layout, inside the directory holding the shards' vector stores"""
+    return os.path.join(vs_path, 'shards.json')
+
+
+def shard_vs_path(vs_path: str, shard: str) -> str:
+    """Location of the vector store of one shard"""
+    return os.path.join(vs_path, shard)
+
+
+class ShardLayout:
+    """How the files of a repo are split over several vector stores: by top-level directory, or by a stable hash of
+    their path into num_shards shards. Every shard has its own vector store and manifest, so shards are built and
+    rebuilt independently"""
+
+    def __init__(self, shard_by: str, num_shards: int = 1, shards: Optional[List[str]] = None):
+        if shard_by not in SHARD_MODES[1:]:
+            raise ValueError(f"Unknown shard mode {shard_by}, must be either directory or hash!")
+        if num_shards < 1:
+            raise ValueError("Number of shards must be at least 1!")
+        self.shard_by = shard_by
+        self.num_shards = num_shards
+        self.shards = shards or []
+
+    def shard_of(self, relative_path: str) -> str:
+        """Shard of a file given its path relative to the repo root"""
+        relative_path = relative_path.replace(os.sep, '/')
+        if self.shard_by == "directory":
+            top_level, _, rest = relative_path.partition('/')
+            return top_level if rest else ROOT_SHARD
+        # python's hash() is salted per process so it cannot be used to place files across runs
+        digest = hashlib.sha1(relative_path.encode('utf-8')).digest()
+        return f"{int.from_bytes(digest[:8], 'big') % self.num_shards:03d}"
+
+    def group(self, root_dir: str, file_paths: List[str]) -> Dict[str, List[str]]:
+        """Split files into their shards, in shard name order. Shards without files are left out"""
+        groups = {}
+        for file_path in file_paths:
+            groups.setdefault(self.shard_of(os.path.relpath(file_path, root_dir)), []).append(file_path)
+        return {shard: groups[shard] for shard in sorted(groups)}
+
+    def settings(self) -> dict:
+        """Layout settings recorded with each shard's manifest, changing them rebuilds every shard"""
+        return {"shard_by": self.shard_by, "num_shards": self.num_shards}
+
+    @staticmethod
+    def load(path: str) -> Optional['ShardLayout']:
+        """Load a shard layout from disk, returns None if the index is not sharded or was written by another version"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            contents = json.load(f)
+        if contents.get("version") != SHARD_LAYOUT_VERSION:
+            return None
+        return ShardLayout(contents["shard_by"], contents["num_shards"], contents["shards"])
+
+    def save(self, path: str):
+        """Atomically write the shard layout to disk"""
+        contents = {
+            "version": SHARD_LAYOUT_VERSION,
+            "shard_by": self.shard_by,
+            "num_shards": self.num_shards,
+            "shards": self.shards
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(contents, f)
+        os.replace(tmp_path, path)
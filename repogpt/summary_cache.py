@@ -0,0 +1,90 @@
+from repogpt.parsers.treesitter import FileSummary, SummaryPosition, TreeSitterParser
+from repogpt.lru_store import LruStore
+from functools import lru_cache
+from typing import Optional, Type
+import hashlib
+import os
+import struct
+
+# number of classes and methods, then per position its start line, end line (-1 if unknown) and name length in bytes
+SUMMARY_COUNTS = struct.Struct('<II')
+SUMMARY_POSITION = struct.Struct('<iiI')
+
+
+def encode_summary(file_summary: FileSummary) -> bytes:
+    """Pack a file summary into a compact binary record"""
+    parts = [SUMMARY_COUNTS.pack(len(file_summary.classes), len(file_summary.methods))]
+    for position in file_summary.classes + file_summary.methods:
+        name = position.name.encode('utf-8')
+        end_line = position.end_line if position.end_line is not None else -1
+        parts.append(SUMMARY_POSITION.pack(position.start_line, end_line, len(name)))
+        parts.append(name)
+    return b''.join(parts)
+
+
+def decode_summary(data: bytes) -> FileSummary:
+    """Unpack a file summary packed by encode_summary"""
+    file_summary = FileSummary()
+    num_classes, num_methods = SUMMARY_COUNTS.unpack_from(data, 0)
+    offset = SUMMARY_COUNTS.size
+    for positions, count in ((file_summary.classes, num_classes), (file_summary.methods, num_methods)):
+        for _ in range(count):
+            start_line, end_line, name_length = SUMMARY_POSITION.unpack_from(data, offset)
+            offset += SUMMARY_POSITION.size
+            name = data[offset:offset + name_length].decode('utf-8')
+            offset += name_length
+            positions.append(SummaryPosition(name, start_line, end_line if end_line != -1 else None))
+    return file_summary
+
+
+def hash_code(code: str) -> bytes:
+    return hashlib.sha256(code.encode('utf-8')).digest()
+
+
+@lru_cache(maxsize=None)
+def parser_version(parser: Type[TreeSitterParser]) -> str:
+    """Version of a parser's summaries, looked up once per process"""
+    return parser.summary_cache_key()
+
+
+@lru_cache(maxsize=None)
+def get_summary_cache(cache_dir: str, max_size_mb: int = 256) -> 'SummaryCache':
+    """Open a summary cache once per process, crawl workers unpickle their cache through this"""
+    return SummaryCache(cache_dir, max_size_mb)
+
+
+class SummaryCache:
+    """On-disk SQLite cache of file summaries keyed by (parser version, content hash), so files that are unchanged
+    since the last crawl are not parsed again. When the cache grows past max_size_mb the least recently used summaries
+    are evicted. A cache is pickled as its location and opened once in each crawl worker, forked workers that inherit
+    the parent's cache open their own connection to it"""
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 256):
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self.store = LruStore(os.path.join(cache_dir, 'summaries.sqlite'), "summaries",
+                              ("parser", "content_hash", "summary"), max_size_mb)
+
+    def __reduce__(self):
+        return get_summary_cache, (self.cache_dir, self.max_size_mb)
+
+    def get(self, parser: str, content_hash: bytes) -> Optional[FileSummary]:
+        """Look up the summary of a file's contents made by a parser version, None if it is not cached"""
+        summary = self.store.get(parser, content_hash)
+        return decode_summary(summary) if summary is not None else None
+
+    def put(self, parser: str, content_hash: bytes, file_summary: FileSummary):
+        """Store the summary of a file's contents, then evict the least recently used summaries if the cache is too
+        big"""
+        self.store.put(parser, content_hash, encode_summary(file_summary))
+
+    def get_file_summary(self, parser: Type[TreeSitterParser], code: str, file_name: str) -> FileSummary:
+        """Summary of a file from the cache, parsing the file only if its contents have not been seen by this version
+        of the parser"""
+        version = parser_version(parser)
+        content_hash = hash_code(code)
+        file_summary = self.get(version, content_hash)
+        if file_summary is None:
+            file_summary = parser.get_file_summary(code, file_name)
+            self.put(version, content_hash, file_summary)
+        return file_summary
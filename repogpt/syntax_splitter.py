@@ -0,0 +1,106 @@
+from langchain.docstore.document import Document
+from langchain.text_splitter import TextSplitter
+from repogpt.line_index import LineIndex
+from repogpt.parsers.treesitter import FileSummary
+from typing import Callable, List
+import copy
+
+# lines directly above a definition that belong to it, like decorators and doc comments
+ATTACHED_LINE_PREFIXES = ('@', '#', '//', '/*', '*')
+
+
+def definition_starts(file_summary: FileSummary, first_line: int = 1) -> List[int]:
+    """1-based start lines of the top level classes and methods of a file. Definitions that start inside an earlier
+    definition are nested and do not start a new chunk"""
+    positions = sorted(file_summary.classes + file_summary.methods, key=lambda pos: pos.start_line)
+
+    starts = []
+    current_end = None
+    for pos in positions:
+        if current_end is not None and pos.start_line <= current_end:
+            continue
+        starts.append(pos.start_line - first_line + 1)
+        current_end = pos.end_line if pos.end_line is not None else pos.start_line
+    return starts
+
+
+def attach_leading_lines(lines: List[str], start_line: int, stop_line: int) -> int:
+    """Move a definition start up over the decorators and comments directly above it, but not above stop_line"""
+    while start_line - 1 > stop_line and lines[start_line - 2].strip().startswith(ATTACHED_LINE_PREFIXES):
+        start_line -= 1
+    return start_line
+
+
+def split_on_definitions(
+        file_doc: Document,
+        file_summary: FileSummary,
+        splitter: TextSplitter,
+        chunk_size: int,
+        first_line: int = 1,
+        length_function: Callable[[str], int] = len
+) -> List[Document]:
+    """Split a file into chunks that start on top level definitions. Consecutive definitions are packed into one chunk
+    while they fit in chunk_size, as measured by length_function, and only definitions larger than chunk_size are split
+    further by the splitter. Chunks carry the same metadata as chunks from the splitter, including their start_index"""
+    text = file_doc.page_content
+    lines = text.split('\n')
+    line_index = LineIndex(text)
+
+    # cut the file into segments that each hold one top level definition and anything up to the next one
+    boundaries = [0]
+    previous_start = 1
+    for start_line in definition_starts(file_summary, first_line):
+        start_line = attach_leading_lines(lines, start_line, previous_start)
+        offset = line_index.line_offset(start_line)
+        if offset > boundaries[-1]:
+            boundaries.append(offset)
+        previous_start = start_line
+    boundaries.append(len(text))
+
+    docs = []
+    chunk_start = chunk_end = 0
+    # segments start on line boundaries so the size of a chunk is close enough to the sum of its segment sizes
+    chunk_length = 0
+    for segment_start, segment_end in zip(boundaries, boundaries[1:]):
+        segment_length = length_function(text[segment_start:segment_end])
+        if chunk_length + segment_length <= chunk_size:
+            chunk_end = segment_end
+            chunk_length += segment_length
+            continue
+        docs.extend(make_chunks(file_doc, chunk_start, chunk_end, splitter, chunk_size, chunk_length))
+        if segment_length > chunk_size:
+            docs.extend(make_chunks(file_doc, segment_start, segment_end, splitter, chunk_size, segment_length))
+            chunk_start = chunk_end = segment_end
+            chunk_length = 0
+        else:
+            chunk_start, chunk_end = segment_start, segment_end
+            chunk_length = segment_length
+    docs.extend(make_chunks(file_doc, chunk_start, chunk_end, splitter, chunk_size, chunk_length))
+    return docs
+
+
+def make_chunks(
+        file_doc: Document,
+        start: int,
+        end: int,
+        splitter: TextSplitter,
+        chunk_size: int,
+        length: int
+) -> List[Document]:
+    """Chunks for the text between two offsets, falling back to the splitter when the text is too large to be one"""
+    text = file_doc.page_content[start:end]
+    if not text.strip():
+        return []
+
+    if length > chunk_size:
+        docs = splitter.create_documents([text], [file_doc.metadata])
+        for doc in docs:
+            doc.metadata['start_index'] += start
+        return docs
+
+    # strip surrounding whitespace like the splitter does, keeping start_index pointing at the first character
+    stripped = text.lstrip()
+    start += len(text) - len(stripped)
+    metadata = copy.deepcopy(file_doc.metadata)
+    metadata['start_index'] = start
+    return [Document(page_content=stripped.rstrip(), metadata=metadata)]
@@ -0,0 +1,30 @@
+from functools import lru_cache
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+# splitters measure the same short pieces of text, such as lines and separators, many times while merging them into
+# chunks, so counts of texts up to this many characters are memoized. Whole chunks are rarely measured twice
+MAX_MEMOIZED_LENGTH = 256
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = ENCODING_NAME) -> tiktoken.Encoding:
+    """Load a tokenizer once per process"""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def encode_length(text: str) -> int:
+    return len(get_tokenizer().encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=16384)
+def count_short_tokens(text: str) -> int:
+    """Memoized token count of a short text, the cache holds at most a few MB of text"""
+    return encode_length(text)
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in a text. Counts of short texts are memoized"""
+    if len(text) <= MAX_MEMOIZED_LENGTH:
+        return count_short_tokens(text)
+    return encode_length(text)
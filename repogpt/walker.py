@@ -0,0 +1,206 @@
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+import logging
+import os
+import re
+
+logger = logging.getLogger("repogpt_crawler_logger")
+
+
+class CrawlReport:
+    """Aggregate counts of the files and directories the crawler accepted or skipped, keyed by reason"""
+
+    def __init__(self):
+        self.files_accepted = 0
+        self.skipped = Counter()
+
+    def skip(self, reason: str):
+        self.skipped[reason] += 1
+
+    def summary(self) -> str:
+        skipped = ", ".join(f"{count} {reason}" for reason, count in self.skipped.most_common())
+        return f"{self.files_accepted} files accepted. Skipped: {skipped or 'nothing'}."
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translate a gitignore glob into a regex matching a '/' separated path"""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i + 1
+            while j < n and pattern[j] == '*':
+                j += 1
+            # '**' only has a special meaning as a whole path segment
+            if j - i > 1 and (i == 0 or pattern[i - 1] == '/') and (j == n or pattern[j] == '/'):
+                if j == n:
+                    res.append('.*')
+                else:
+                    res.append('(?:.*/)?')
+                    j += 1
+            else:
+                res.append('[^/]*')
+            i = j
+            continue
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                res.append('\\[')
+            else:
+                stuff = pattern[i + 1:j].replace('\\', '\\\\')
+                if stuff[0] in '!^':
+                    stuff = '^' + stuff[1:]
+                res.append(f'[{stuff}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            res.append(re.escape(pattern[i + 1]))
+            i += 1
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return f"(?s:{''.join(res)})\\Z"
+
+
+class IgnorePattern:
+
+    def __init__(self, pattern: str):
+        self.negate = pattern.startswith('!')
+        if self.negate or pattern.startswith('\\'):
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # patterns with a separator are relative to the directory of the ignore file, others match at any depth
+        self.anchored = '/' in pattern
+        self.regex = re.compile(translate_pattern(pattern.lstrip('/')))
+
+    @staticmethod
+    def parse(line: str) -> Optional['IgnorePattern']:
+        """Parse a line of an ignore file, returns None for blank lines and comments"""
+        line = line.rstrip('\n\r')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#') or line.strip('!/') == '':
+            return None
+        return IgnorePattern(line)
+
+    def matches(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path if self.anchored else name) is not None
+
+
+def read_ignore_file(file_path: str) -> List[IgnorePattern]:
+    if not os.path.isfile(file_path):
+        return []
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        patterns = [IgnorePattern.parse(line) for line in f]
+    return [pattern for pattern in patterns if pattern is not None]
+
+
+# each frame holds the directory an ignore file lives in (relative to the root) and its patterns
+IgnoreFrames = List[Tuple[str, List[IgnorePattern]]]
+
+
+class IgnoreMatcher:
+    """Decides whether paths in a git repo are ignored by .gitignore files, .git/info/exclude and extra exclude globs.
+    Hidden files and directories are always ignored"""
+
+    def __init__(self, root_dir: str, exclude_patterns: Optional[List[str]] = None, use_ignore_files: bool = True):
+        self.root_dir = root_dir
+        self.use_ignore_files = use_ignore_files
+        self.root_frames = [('', read_ignore_file(os.path.join(root_dir, '.git', 'info', 'exclude')))] \
+            if use_ignore_files else []
+        # extra excludes are checked last so they override everything in the repo's ignore files
+        self.exclude_patterns = [pattern for pattern in map(IgnorePattern.parse, exclude_patterns or []) if pattern]
+        self._dir_patterns = {}
+
+    def dir_patterns(self, rel_dir: str) -> List[IgnorePattern]:
+        """Patterns from the .gitignore in a directory, loaded once per directory"""
+        if not self.use_ignore_files:
+            return []
+        if rel_dir not in self._dir_patterns:
+            self._dir_patterns[rel_dir] = read_ignore_file(os.path.join(self.root_dir, rel_dir, '.gitignore'))
+        return self._dir_patterns[rel_dir]
+
+    def child_frames(self, frames: IgnoreFrames, rel_dir: str) -> IgnoreFrames:
+        """Frames that apply to the entries of a directory given the frames that apply to the directory itself"""
+        patterns = self.dir_patterns(rel_dir)
+        return frames + [(rel_dir, patterns)] if patterns else frames
+
+    def is_ignored(self, frames: IgnoreFrames, rel_path: str, is_dir: bool) -> bool:
+        """Whether an entry is ignored assuming none of its parent directories are. The last matching pattern wins"""
+        name = rel_path.rsplit('/', 1)[-1]
+        if name.startswith('.'):
+            return True
+
+        ignored = False
+        for base_dir, patterns in frames:
+            sub_path = rel_path[len(base_dir) + 1:] if base_dir else rel_path
+            for pattern in patterns:
+                if pattern.negate == ignored and pattern.matches(sub_path, name, is_dir):
+                    ignored = not pattern.negate
+        for pattern in self.exclude_patterns:
+            if pattern.negate == ignored and pattern.matches(rel_path, name, is_dir):
+                ignored = not pattern.negate
+        return ignored
+
+    def is_path_ignored(self, rel_path: str) -> bool:
+        """Whether a single file is ignored, checking each of its parent directories along the way"""
+        frames = self.child_frames(self.root_frames, '')
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            rel_dir = '/'.join(parts[:depth])
+            if self.is_ignored(frames, rel_dir, is_dir=True):
+                return True
+            frames = self.child_frames(frames, rel_dir)
+        return self.is_ignored(frames, rel_path, is_dir=False)
+
+
+def walk_repo(
+        root_dir: str,
+        exclude_patterns: Optional[List[str]] = None,
+        report: Optional[CrawlReport] = None
+) -> Iterator[Tuple[str, str]]:
+    """Walk a repo yielding (dir_path, file_name) for every file that is not ignored. Ignored directories are pruned
+    without being descended into and entries are read with os.scandir to avoid extra stat calls. Files are yielded in a
+    deterministic order"""
+    report = report if report is not None else CrawlReport()
+    matcher = IgnoreMatcher(root_dir, exclude_patterns)
+
+    stack = [(root_dir, '', matcher.root_frames)]
+    while stack:
+        dir_path, rel_dir, frames = stack.pop()
+        frames = matcher.child_frames(frames, rel_dir)
+
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            logger.warning(f"Could not read directory {dir_path}. {e}")
+            report.skip("unreadable directories")
+            continue
+
+        sub_dirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if matcher.is_ignored(frames, rel_path, is_dir):
+                report.skip("ignored directories" if is_dir else "ignored files")
+            elif is_dir:
+                sub_dirs.append((entry.path, rel_path, frames))
+            elif entry.is_symlink() and entry.is_dir():
+                # like os.walk, symlinked directories are not followed
+                report.skip("symlinked directories")
+            else:
+                yield dir_path, entry.name
+
+        stack.extend(reversed(sub_dirs))
@@ -10,6 +10,7 @@ setup(
     description='An LLM-based coding mentor for your repository',
     url='https://github.com/alexminnaar/RepoGPT',
     packages=find_packages(),
+    package_data={'repogpt.parsers': ['queries/*.scm']},
     install_requires=requirements,
     entry_points={
         'console_scripts': [
@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import os
+from repogpt.checkpoint import IndexCheckpoint, checkpoint_path
+from repogpt.manifest import FileRecord
+
+SETTINGS = {"chunk_size": 3000, "chunk_overlap": 0}
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = checkpoint_path(os.path.join(self.tmp_dir.name, "vs"))
+
+    def start_checkpoint(self) -> IndexCheckpoint:
+        records = {
+            "kept.py": FileRecord(1, 1, "kept-hash", ["kept.py:0"]),
+            "a.py": FileRecord(2, 2, "a-hash", []),
+            "b.py": FileRecord(3, 3, "b-hash", []),
+        }
+        checkpoint = IndexCheckpoint(self.path, SETTINGS, "abc123", records, ["a.py", "b.py"])
+        checkpoint.start()
+        return checkpoint
+
+    def test_load_returns_none_without_checkpoint(self):
+        assert IndexCheckpoint.load(self.path) is None
+
+    def test_load_replays_committed_batches(self):
+        checkpoint = self.start_checkpoint()
+        checkpoint.commit({"a.py": FileRecord(2, 2, "a-hash", ["a.py:0", "a.py:50"])})
+
+        loaded = IndexCheckpoint.load(self.path)
+
+        assert loaded.settings == SETTINGS
+        assert loaded.commit_sha == "abc123"
+        assert loaded.pending_files() == ["b.py"]
+        assert loaded.committed["a.py"].chunk_ids == ["a.py:0", "a.py:50"]
+
+    def test_truncated_batch_is_not_committed(self):
+        checkpoint = self.start_checkpoint()
+        checkpoint.commit({"a.py": FileRecord(2, 2, "a-hash", ["a.py:0"])})
+        with open(self.path, 'a') as f:
+            f.write('{"files": {"b.py": {"si')
+
+        loaded = IndexCheckpoint.load(self.path)
+
+        assert loaded.pending_files() == ["b.py"]
+
+    def test_begun_batch_is_uncommitted_until_committed(self):
+        checkpoint = self.start_checkpoint()
+        checkpoint.begin({"a.py": FileRecord(2, 2, "a-hash", ["a.py:0", "a.py:50"])})
+
+        assert IndexCheckpoint.load(self.path).uncommitted_ids == ["a.py:0", "a.py:50"]
+
+        checkpoint.commit({"a.py": FileRecord(2, 2, "a-hash", ["a.py:0", "a.py:50"])})
+        loaded = IndexCheckpoint.load(self.path)
+
+        assert loaded.uncommitted_ids == []
+        assert loaded.pending_files() == ["b.py"]
+
+    def test_to_manifest_leaves_out_pending_files(self):
+        checkpoint = self.start_checkpoint()
+        checkpoint.commit({"a.py": FileRecord(2, 2, "a-hash", ["a.py:0"])})
+
+        manifest = IndexCheckpoint.load(self.path).to_manifest()
+
+        assert sorted(manifest.records) == ["a.py", "kept.py"]
+        assert manifest.records["a.py"].chunk_ids == ["a.py:0"]
+        assert manifest.commit_sha is None
+
+    def test_remove(self):
+        checkpoint = self.start_checkpoint()
+        checkpoint.remove()
+        assert not os.path.exists(self.path)
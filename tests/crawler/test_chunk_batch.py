@@ -0,0 +1,44 @@
+import unittest
+import pickle
+from langchain.docstore.document import Document
+from repogpt.chunk_batch import ChunkBatch
+
+
+def make_doc(source: str, start_index: int) -> Document:
+    return Document(page_content=f"chunk at {start_index}",
+                    metadata={'source': source, 'start_index': start_index, 'end_index': start_index + 10,
+                              'starting_line': 1, 'ending_line': 2, 'code_start': 0, 'code_end': 10,
+                              'num_tokens': 4, 'context': {'classes': [], 'methods': [['main', 1, 2]]}})
+
+
+class ChunkBatchTestCase(unittest.TestCase):
+
+    def test_round_trips_documents(self):
+        docs = [make_doc("a.py", 0), make_doc("a.py", 10), make_doc("b.py", 0)]
+
+        batch = ChunkBatch.from_documents(docs)
+
+        assert len(batch) == 3
+        assert batch.to_documents() == docs
+        assert batch.ids() == ["a.py:0", "a.py:10", "b.py:0"]
+
+    def test_paths_are_interned(self):
+        batch = ChunkBatch.from_documents([make_doc("a.py", i) for i in range(100)])
+
+        assert batch.paths == ["a.py"]
+        assert list(batch.path_ids) == [0] * 100
+
+    def test_extend_remaps_paths(self):
+        batch = ChunkBatch.from_documents([make_doc("a.py", 0)])
+        other = pickle.loads(pickle.dumps(ChunkBatch.from_documents([make_doc("b.py", 0), make_doc("a.py", 10)])))
+
+        batch.extend(other)
+
+        assert batch.paths == ["a.py", "b.py"]
+        assert batch.ids() == ["a.py:0", "b.py:0", "a.py:10"]
+        assert batch.metadata(2)['end_index'] == 20
+
+    def test_missing_metadata_is_left_out(self):
+        batch = ChunkBatch.from_documents([Document(page_content="x", metadata={'source': 'a.py', 'start_index': 0})])
+
+        assert batch.metadata(0) == {'source': 'a.py', 'start_index': 0, 'context': {}}
@@ -0,0 +1,75 @@
+import unittest
+import tempfile
+import os
+from langchain.docstore.document import Document
+from repogpt.chunk_batch import ChunkBatch
+from repogpt.chunk_store import ChunkStore, ChunkStoreWriter, chunk_store_path
+from repogpt.manifest import FileRecord
+
+SETTINGS = {"chunk_size": 3000, "chunk_overlap": 0}
+
+
+def make_chunks(source: str, texts: list) -> ChunkBatch:
+    return ChunkBatch.from_documents([Document(page_content=text, metadata={
+        'source': source, 'start_index': i * 100, 'num_tokens': len(text), 'context': {'methods': [['f', 1, 2]]}})
+        for i, text in enumerate(texts)])
+
+
+class ChunkStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = chunk_store_path(os.path.join(self.tmp_dir.name, "vs"))
+
+    def write_store(self, files: dict) -> ChunkStore:
+        writer = ChunkStoreWriter(self.path, SETTINGS, "abc123")
+        for file_path, texts in files.items():
+            writer.add_file(file_path, FileRecord(1, 1, f"{file_path}-hash"), make_chunks(file_path, texts))
+        writer.commit()
+        store = ChunkStore.open(self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_open_returns_none_without_store(self):
+        assert ChunkStore.open(self.path) is None
+
+    def test_round_trips_file_chunks(self):
+        store = self.write_store({"a.py": ["def f():", "    return 'ü'"], "b.py": ["x = 1"]})
+
+        chunks = store.file_chunks("a.py")
+
+        assert store.settings == SETTINGS
+        assert store.commit_sha == "abc123"
+        assert len(store) == 3
+        assert chunks.texts == ["def f():", "    return 'ü'"]
+        assert chunks.metadata(1) == {'source': 'a.py', 'start_index': 100, 'num_tokens': 14,
+                                      'context': {'methods': [['f', 1, 2]]}}
+        assert store.file_chunks("b.py").ids() == ["b.py:0"]
+
+    def test_records_hold_chunk_ids(self):
+        store = self.write_store({"a.py": ["one", "two"], "empty.py": []})
+
+        records = store.records()
+
+        assert records["a.py"].chunk_ids == ["a.py:0", "a.py:100"]
+        assert records["a.py"].content_hash == "a.py-hash"
+        assert records["empty.py"].chunk_ids == []
+
+    def test_commit_replaces_old_store(self):
+        self.write_store({"a.py": ["one"]})
+        store = self.write_store({"b.py": ["two"]})
+
+        assert list(store.files) == ["b.py"]
+        assert not os.path.exists(f"{self.path}.tmp")
+        assert not os.path.exists(f"{self.path}.old")
+
+    def test_abort_keeps_old_store(self):
+        self.write_store({"a.py": ["one"]})
+        writer = ChunkStoreWriter(self.path, SETTINGS, None)
+        writer.add_file("b.py", FileRecord(1, 1, "hash"), make_chunks("b.py", ["two"]))
+        writer.abort()
+
+        store = ChunkStore.open(self.path)
+        self.addCleanup(store.close)
+        assert list(store.files) == ["a.py"]
@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import os
+from unittest import mock
+from repogpt import crawler
+from repogpt.chunk_settings import ChunkSettings
+from repogpt.crawler import crawl_and_split, update_index
+from repogpt.git_utils import run_git
+from repogpt.parsers.grammars import GRAMMAR_BUNDLE_ENV
+from repogpt.parsers.treesitter import TreeSitterParser
+from tests.crawler.test_resume_index import ListDeepLake, ZeroEmbeddings
+
+
+class CrawlAndSplitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.repo_dir = self.tmp_dir.name
+        run_git(self.repo_dir, "init", "-q")
+
+        for i in range(12):
+            self.write_file(f"module_{i}.py", "".join(f"def function_{i}_{j}():\n    return {j}\n\n\n"
+                                                      for j in range(i + 3)))
+        self.write_file("README.md", "# Title\n\nSome text about the repo.\n")
+        # not valid utf-8, so loading the file fails
+        self.write_file("broken.py", b"name = '\xff\xfe'\n")
+
+    def write_file(self, file_name: str, contents):
+        mode = 'wb' if isinstance(contents, bytes) else 'w'
+        with open(os.path.join(self.repo_dir, file_name), mode) as f:
+            f.write(contents)
+
+    def chunks(self, workers: int):
+        return [(doc.page_content, doc.metadata) for doc in crawl_and_split(self.repo_dir, 120, 0, workers=workers)]
+
+    def test_parallel_crawl_matches_serial_crawl(self):
+        serial = self.chunks(workers=1)
+        parallel = self.chunks(workers=3)
+
+        assert parallel == serial
+        assert len({metadata['source'] for _, metadata in parallel}) == 13
+
+    def test_file_that_fails_to_load_is_skipped(self):
+        sources = [metadata['source'] for _, metadata in self.chunks(workers=3)]
+
+        assert os.path.join(self.repo_dir, "broken.py") not in sources
+        assert os.path.join(self.repo_dir, "module_11.py") in sources
+
+    def without_grammar_bundle(self):
+        missing_bundle = os.path.join(self.tmp_dir.name, "no-grammars")
+        return mock.patch.dict(os.environ, {GRAMMAR_BUNDLE_ENV: missing_bundle}), \
+            mock.patch.object(TreeSitterParser, "loaded", False)
+
+    def test_missing_grammar_bundle_stops_serial_and_parallel_crawls(self):
+        self.write_file("app.js", "function main() {\n  return 1;\n}\n")
+
+        env_patch, loaded_patch = self.without_grammar_bundle()
+        with env_patch, loaded_patch:
+            for workers in (1, 3):
+                with self.assertRaises(ValueError):
+                    self.chunks(workers=workers)
+
+    def test_missing_grammar_bundle_leaves_the_index_untouched(self):
+        vs_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(vs_dir.cleanup)
+        vs_path = os.path.join(vs_dir.name, "vs")
+        with mock.patch.object(crawler, "DeepLake", ListDeepLake):
+            update_index(self.repo_dir, ZeroEmbeddings(), vs_path, chunk_settings=ChunkSettings(120, 0))
+            rows = list(ListDeepLake.datasets[vs_path])
+            self.write_file("module_0.py", "def changed():\n    return 0\n")
+            self.write_file("app.js", "function main() {\n  return 1;\n}\n")
+
+            env_patch, loaded_patch = self.without_grammar_bundle()
+            with env_patch, loaded_patch, self.assertRaises(ValueError):
+                update_index(self.repo_dir, ZeroEmbeddings(), vs_path, chunk_settings=ChunkSettings(120, 0))
+
+        assert ListDeepLake.datasets[vs_path] == rows
@@ -0,0 +1,95 @@
+import unittest
+import tempfile
+import os
+from repogpt.crawler import diff_git_changes, get_git_state
+from repogpt.git_utils import run_git
+from repogpt.manifest import Manifest
+
+
+class DiffGitChangesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.repo_dir = self.tmp_dir.name
+        run_git(self.repo_dir, "init", "-q")
+        run_git(self.repo_dir, "config", "user.email", "test@example.com")
+        run_git(self.repo_dir, "config", "user.name", "test")
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.repo_dir, file_name)
+
+    def write_file(self, file_name: str, contents: str):
+        os.makedirs(os.path.dirname(self.path(file_name)), exist_ok=True)
+        with open(self.path(file_name), 'w') as f:
+            f.write(contents)
+
+    def commit_all(self):
+        run_git(self.repo_dir, "add", "-A")
+        run_git(self.repo_dir, "commit", "-q", "-m", "commit")
+
+    def index(self, file_names) -> Manifest:
+        """Manifest of an index of the files as they are now"""
+        manifest_diff = Manifest().diff([self.path(file_name) for file_name in file_names])
+        return Manifest(manifest_diff.records, {}, *get_git_state(self.repo_dir))
+
+    def test_reverted_uncommitted_edit_is_changed(self):
+        self.write_file("edited.py", "a = 1\n")
+        self.commit_all()
+        self.write_file("edited.py", "a = 2\n")
+        manifest = self.index(["edited.py"])
+
+        run_git(self.repo_dir, "checkout", "--", "edited.py")
+        manifest_diff = diff_git_changes(self.repo_dir, manifest)
+
+        assert manifest_diff.changed == [self.path("edited.py")]
+
+    def test_deleted_untracked_file_is_deleted(self):
+        self.write_file("kept.py", "a = 1\n")
+        self.commit_all()
+        self.write_file("untracked.py", "b = 2\n")
+        manifest = self.index(["kept.py", "untracked.py"])
+
+        os.remove(self.path("untracked.py"))
+        manifest_diff = diff_git_changes(self.repo_dir, manifest)
+
+        assert manifest_diff.deleted == [self.path("untracked.py")]
+        assert list(manifest_diff.records) == [self.path("kept.py")]
+
+    def test_newly_ignored_files_are_deleted(self):
+        self.write_file("kept.py", "a = 1\n")
+        self.write_file("build/generated.py", "b = 2\n")
+        self.write_file("vendor/lib.py", "c = 3\n")
+        self.commit_all()
+        manifest = self.index(["kept.py", "build/generated.py", "vendor/lib.py"])
+
+        self.write_file(".gitignore", "build/\n")
+        manifest_diff = diff_git_changes(self.repo_dir, manifest, exclude_patterns=["vendor/"])
+
+        assert sorted(manifest_diff.deleted) == [self.path("build/generated.py"), self.path("vendor/lib.py")]
+        assert manifest_diff.changed == []
+
+    def test_clean_files_are_not_rechecked(self):
+        self.write_file("clean.py", "a = 1\n")
+        self.commit_all()
+        manifest = self.index(["clean.py"])
+
+        assert manifest.dirty_paths == []
+        assert diff_git_changes(self.repo_dir, manifest).unchanged == []
+
+    def test_git_source_leaves_out_untracked_files(self):
+        self.write_file("kept.py", "a = 1\n")
+        self.commit_all()
+        self.write_file("indexed_untracked.py", "b = 2\n")
+        manifest = self.index(["kept.py", "indexed_untracked.py"])
+
+        self.write_file("new_untracked.py", "c = 3\n")
+        manifest_diff = diff_git_changes(self.repo_dir, manifest, file_source="git")
+
+        assert manifest_diff.added == []
+        assert manifest_diff.deleted == [self.path("indexed_untracked.py")]
+        assert list(manifest_diff.records) == [self.path("kept.py")]
+
+        manifest_diff = diff_git_changes(self.repo_dir, manifest, file_source="git", include_untracked=True)
+        assert manifest_diff.added == [self.path("new_untracked.py")]
+        assert manifest_diff.deleted == []
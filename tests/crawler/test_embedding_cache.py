@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+from typing import List
+from langchain_core.embeddings import Embeddings
+from repogpt.embedding_cache import CachedEmbeddings, EmbeddingCache, embedding_model_name, hash_text
+
+
+class CountingEmbeddings(Embeddings):
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(len(text)), 0.5]
+
+
+class EmbeddingCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_cache_hits_skip_embedding(self):
+        base_embeddings = CountingEmbeddings()
+        embeddings = CachedEmbeddings(base_embeddings, EmbeddingCache(self.tmp_dir.name))
+
+        first = embeddings.embed_documents(["a", "bb", "a"])
+        # a new cache over the same directory sees the vectors of the previous run
+        embeddings = CachedEmbeddings(base_embeddings, EmbeddingCache(self.tmp_dir.name))
+        second = embeddings.embed_documents(["bb", "ccc"])
+
+        assert first == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+        assert second == [[2.0, 0.5], [3.0, 0.5]]
+        assert base_embeddings.embedded == ["a", "bb", "ccc"]
+
+    def test_wrapped_requests_share_the_cache(self):
+        base_embeddings = CountingEmbeddings()
+        embeddings = CachedEmbeddings(base_embeddings, EmbeddingCache(self.tmp_dir.name))
+        embeddings.embed_documents(["a"])
+        sent = []
+
+        def wrapper(inner: Embeddings) -> Embeddings:
+            sent.append(inner)
+            return inner
+
+        wrapped = embeddings.wrap_requests(wrapper)
+        wrapped.embed_documents(["a", "bb"])
+
+        assert sent == [base_embeddings]
+        assert wrapped.model == embeddings.model
+        assert base_embeddings.embedded == ["a", "bb"]
+
+    def test_cached_embeddings_are_named_after_their_model(self):
+        base_embeddings = CountingEmbeddings()
+        embeddings = CachedEmbeddings(base_embeddings, EmbeddingCache(self.tmp_dir.name))
+
+        assert embedding_model_name(embeddings) == embedding_model_name(base_embeddings)
+
+    def test_models_do_not_share_vectors(self):
+        cache = EmbeddingCache(self.tmp_dir.name)
+        cache.put_many("model-a", {hash_text("a"): [1.0]})
+
+        assert cache.get_many("model-b", [hash_text("a")]) == {}
+
+    def test_least_recently_used_vectors_are_evicted(self):
+        # room for two and a half 1024 dimension float32 vectors
+        cache = EmbeddingCache(self.tmp_dir.name, max_size_mb=0)
+        cache.store.max_size = 2.5 * 4096
+        cache.put_many("model", {hash_text("a"): [0.0] * 1024})
+        cache.put_many("model", {hash_text("b"): [0.0] * 1024})
+        cache.get_many("model", [hash_text("a")])
+        cache.put_many("model", {hash_text("c"): [0.0] * 1024})
+
+        cached = cache.get_many("model", [hash_text(text) for text in "abc"])
+        assert sorted(cached) == sorted([hash_text("a"), hash_text("c")])
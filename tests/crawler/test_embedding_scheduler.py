@@ -0,0 +1,149 @@
+import unittest
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from repogpt.embedding_scheduler import EmbeddingScheduler, TokenBucket
+
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    """Embedding endpoint that embeds a text as [len(text)] after a short delay and throttles every third request"""
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            throttled = server.num_requests % 3 == 0
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        time.sleep(server.latency)
+        texts = json.loads(self.rfile.read(int(self.headers['Content-Length'])))["input"]
+        if throttled:
+            self.send_response(429)
+            body = b'{"error": "rate limited"}'
+        else:
+            self.send_response(200)
+            body = json.dumps({"data": [{"embedding": [float(len(text))]} for text in texts]}).encode()
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerEmbeddings:
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        request = urllib.request.Request(self.url, data=json.dumps({"input": texts}).encode(), method='POST')
+        with urllib.request.urlopen(request) as response:
+            return [item["embedding"] for item in json.loads(response.read())["data"]]
+
+
+class DictCachedEmbeddings:
+    """In-memory stand-in for CachedEmbeddings that only sends the texts it has not seen to the embeddings it wraps"""
+
+    def __init__(self, embeddings, vectors: dict):
+        self.embeddings = embeddings
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = [text for text in texts if text not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.embeddings.embed_documents(missing)))
+        return [self.vectors[text] for text in texts]
+
+    def wrap_requests(self, wrapper) -> 'DictCachedEmbeddings':
+        return DictCachedEmbeddings(wrapper(self.embeddings), self.vectors)
+
+
+class EmbeddingSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubEmbeddingHandler)
+        self.server.lock = threading.Lock()
+        self.server.num_requests = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.latency = 0.05
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.embeddings = StubServerEmbeddings(f"http://127.0.0.1:{self.server.server_address[1]}/embeddings")
+
+    def test_results_are_ordered_and_throttled_requests_retried(self):
+        scheduler = EmbeddingScheduler(self.embeddings, batch_size=2, max_in_flight=4, base_delay=0.01)
+        groups = [(i, ["x" * (i * 10 + j) for j in range(5)]) for i in range(6)]
+
+        results = list(scheduler.embed(iter(groups)))
+
+        assert [payload for payload, _ in results] == list(range(6))
+        for payload, vectors in results:
+            assert vectors == [[float(payload * 10 + j)] for j in range(5)]
+        assert 1 < self.server.max_in_flight <= 4
+
+    def test_concurrent_requests_are_faster_than_serial(self):
+        groups = [(i, ["text"] * 4) for i in range(4)]
+
+        start = time.perf_counter()
+        list(EmbeddingScheduler(self.embeddings, batch_size=1, max_in_flight=1, base_delay=0.01).embed(groups))
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        list(EmbeddingScheduler(self.embeddings, batch_size=1, max_in_flight=8, base_delay=0.01).embed(groups))
+        concurrent = time.perf_counter() - start
+
+        assert concurrent < serial / 2
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = EmbeddingScheduler(self.embeddings, batch_size=1, max_in_flight=1, max_retries=0)
+        self.server.num_requests = 2
+
+        with self.assertRaises(urllib.error.HTTPError):
+            list(scheduler.embed([(0, ["text"])]))
+
+    def test_max_in_flight_is_shared_by_concurrent_embed_calls(self):
+        scheduler = EmbeddingScheduler(self.embeddings, batch_size=1, max_in_flight=2, base_delay=0.01)
+        groups = [(i, ["text"] * 4) for i in range(4)]
+        threads = [threading.Thread(target=lambda: list(scheduler.embed(groups))) for _ in range(3)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.server.max_in_flight <= 2
+
+    def test_cache_hits_are_not_rate_limited(self):
+        # 4 texts of about 100 tokens each fit in the budget once, charging them again would wait for about 20s
+        scheduler = EmbeddingScheduler(DictCachedEmbeddings(self.embeddings, {}), tokens_per_minute=600)
+        groups = [(0, ["x" * 400 + str(i) for i in range(4)])]
+        list(scheduler.embed(groups))
+
+        start = time.perf_counter()
+        results = list(scheduler.embed(groups))
+
+        assert time.perf_counter() - start < 1
+        assert results[0][1] == [[401.0]] * 4
+        assert self.server.num_requests == 1
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_acquire_waits_for_refill(self):
+        bucket = TokenBucket(tokens_per_minute=6000)
+        bucket.acquire(6000)
+
+        start = time.perf_counter()
+        bucket.acquire(10)
+        assert time.perf_counter() - start >= 0.09
@@ -0,0 +1,39 @@
+import unittest
+import tempfile
+import os
+from repogpt.file_guards import FileGuards
+
+
+class FileGuardsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_guards = FileGuards(max_file_size=10_000)
+
+    def write_file(self, contents: bytes) -> str:
+        file_path = os.path.join(self.tmp_dir.name, "file")
+        with open(file_path, 'wb') as f:
+            f.write(contents)
+        return file_path
+
+    def test_regular_file_is_accepted(self):
+        assert self.file_guards.skip_reason(self.write_file(b"def f():\n    return 1\n")) is None
+
+    def test_large_file(self):
+        assert self.file_guards.skip_reason(self.write_file(b"a = 1\n" * 2000)) == "files too large"
+
+    def test_binary_file(self):
+        assert self.file_guards.skip_reason(self.write_file(b"\x89PNG\r\n\x1a\n\0\0\0")) == "binary files"
+
+    def test_minified_file(self):
+        assert self.file_guards.skip_reason(self.write_file(b"var a=1;" * 800)) == "minified files"
+        assert self.file_guards.skip_reason(self.write_file(b"x" * 300 + b"\n" + b"y" * 300)) == "minified files"
+
+    def test_generated_file(self):
+        contents = b"// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n"
+        assert self.file_guards.skip_reason(self.write_file(contents)) == "generated files"
+
+    def test_disabled_checks(self):
+        file_guards = FileGuards(max_file_size=0, max_avg_line_length=0, max_line_length=0, generated_markers=[])
+        assert file_guards.skip_reason(self.write_file(b"// @generated\n" + b"var a=1;" * 2000)) is None
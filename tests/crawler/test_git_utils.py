@@ -0,0 +1,73 @@
+import unittest
+import tempfile
+import os
+from repogpt.git_utils import run_git, get_head_sha, get_changed_files, list_files
+from repogpt.manifest import hash_file
+
+
+class GitUtilsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.repo_dir = self.tmp_dir.name
+        run_git(self.repo_dir, "init", "-q")
+        run_git(self.repo_dir, "config", "user.email", "test@example.com")
+        run_git(self.repo_dir, "config", "user.name", "test")
+
+    def write_file(self, file_name: str, contents: str):
+        with open(os.path.join(self.repo_dir, file_name), 'w') as f:
+            f.write(contents)
+
+    def commit_all(self):
+        run_git(self.repo_dir, "add", "-A")
+        run_git(self.repo_dir, "commit", "-q", "-m", "commit")
+
+    def test_get_head_sha_empty_repo(self):
+        assert get_head_sha(self.repo_dir) is None
+
+    def test_get_changed_files(self):
+        self.write_file("kept.py", "a = 1\n")
+        self.write_file("modified.py", "b = 2\n")
+        self.write_file("deleted.py", "c = 3\n")
+        self.write_file(".gitignore", "ignored.py\n")
+        self.commit_all()
+        indexed_sha = get_head_sha(self.repo_dir)
+
+        # one committed change and one uncommitted change
+        os.remove(os.path.join(self.repo_dir, "deleted.py"))
+        self.commit_all()
+        self.write_file("modified.py", "b = 3\n")
+        self.write_file("untracked.py", "d = 4\n")
+        self.write_file("ignored.py", "e = 5\n")
+
+        changed, deleted = get_changed_files(self.repo_dir, indexed_sha)
+
+        assert sorted(changed) == [os.path.join(self.repo_dir, "modified.py"),
+                                   os.path.join(self.repo_dir, "untracked.py")]
+        assert deleted == [os.path.join(self.repo_dir, "deleted.py")]
+
+        changed, _ = get_changed_files(self.repo_dir, indexed_sha, include_untracked=False)
+        assert changed == [os.path.join(self.repo_dir, "modified.py")]
+
+    def test_list_files(self):
+        self.write_file("clean.py", "a = 1\n")
+        self.write_file("modified.py", "b = 2\n")
+        self.write_file("deleted.py", "c = 3\n")
+        self.write_file(".gitignore", "ignored.py\n")
+        self.commit_all()
+        self.write_file("modified.py", "b = 3\n")
+        os.remove(os.path.join(self.repo_dir, "deleted.py"))
+        self.write_file("untracked.py", "d = 4\n")
+        self.write_file("ignored.py", "e = 5\n")
+
+        clean_path = os.path.join(self.repo_dir, "clean.py")
+        gitignore_path = os.path.join(self.repo_dir, ".gitignore")
+        tracked = dict(list_files(self.repo_dir))
+        assert tracked == {gitignore_path: hash_file(gitignore_path),
+                           clean_path: hash_file(clean_path),
+                           os.path.join(self.repo_dir, "modified.py"): None}
+
+        with_untracked = dict(list_files(self.repo_dir, include_untracked=True))
+        assert os.path.join(self.repo_dir, "untracked.py") in with_untracked
+        assert os.path.join(self.repo_dir, "ignored.py") not in with_untracked
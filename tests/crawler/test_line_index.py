@@ -0,0 +1,16 @@
+import unittest
+from repogpt.line_index import LineIndex
+
+
+class LineIndexTestCase(unittest.TestCase):
+
+    def test_line_number_matches_counting_newlines(self):
+        text = "\ndef hello_world():\n    print('Hello, World!')\n\n# Call the function\nhello_world()\n"
+        line_index = LineIndex(text)
+
+        for offset in range(len(text) + 1):
+            assert line_index.line_number(offset) == text[:offset].count('\n') + 1
+
+    def test_num_lines(self):
+        assert LineIndex("").num_lines() == 1
+        assert LineIndex("a\nb\n").num_lines() == 3
@@ -0,0 +1,46 @@
+import unittest
+import tempfile
+import os
+from repogpt.lru_store import LruStore
+
+
+class LruStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def open_store(self, **kwargs) -> LruStore:
+        return LruStore(os.path.join(self.tmp_dir.name, "store.sqlite"), "blobs", ("namespace", "key", "value"), 1,
+                        **kwargs)
+
+    def last_used(self, store: LruStore, key: bytes) -> float:
+        return store.connection.execute("SELECT last_used FROM blobs WHERE key = ?", (key,)).fetchone()[0]
+
+    def test_replaced_values_are_counted_once(self):
+        store = self.open_store()
+        store.put("ns", b"a", b"x" * 10)
+        store.put("ns", b"a", b"y" * 4)
+        store.put_many("ns", {b"a": b"z" * 6, b"b": b"z" * 2})
+
+        assert store.size == store._stored_size() == 8
+        assert self.open_store().size == 8
+
+    def test_hits_are_written_with_the_next_put(self):
+        store = self.open_store()
+        store.put("ns", b"a", b"x")
+        first_used = self.last_used(store, b"a")
+
+        assert store.get("ns", b"a") == b"x"
+        assert self.last_used(store, b"a") == first_used
+
+        store.put("ns", b"b", b"y")
+        assert self.last_used(store, b"a") > first_used
+
+    def test_hits_are_written_once_touch_batch_pile_up(self):
+        store = self.open_store(touch_batch=2)
+        store.put_many("ns", {b"a": b"x", b"b": b"y"})
+
+        store.get_many("ns", [b"a", b"b", b"missing"])
+
+        assert store.touched == {}
@@ -0,0 +1,112 @@
+import unittest
+import tempfile
+import os
+from repogpt.manifest import Manifest, FileRecord, hash_contents, hash_file
+
+
+class ManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_file(self, file_name: str, contents: str) -> str:
+        file_path = os.path.join(self.tmp_dir.name, file_name)
+        with open(file_path, 'w') as f:
+            f.write(contents)
+        return file_path
+
+    def test_hash_contents_matches_git_blob_id(self):
+        # `echo 'hello world' | git hash-object --stdin`
+        assert hash_contents(b"hello world\n") == "3b18e512dba79e4c8300dd08aeb37f8e728b8dad"
+
+    def test_diff_detects_added_changed_deleted_and_unchanged(self):
+        unchanged_path = self.write_file("unchanged.py", "a = 1\n")
+        changed_path = self.write_file("changed.py", "b = 2\n")
+        deleted_path = os.path.join(self.tmp_dir.name, "deleted.py")
+
+        manifest = Manifest({
+            unchanged_path: FileRecord(os.stat(unchanged_path).st_size, os.stat(unchanged_path).st_mtime_ns,
+                                       hash_file(unchanged_path), ["unchanged.py:0"]),
+            changed_path: FileRecord(0, 0, "stale-hash", ["changed.py:0"]),
+            deleted_path: FileRecord(1, 1, "deleted-hash", ["deleted.py:0", "deleted.py:10"]),
+        })
+        added_path = self.write_file("added.py", "c = 3\n")
+
+        diff = manifest.diff([unchanged_path, changed_path, added_path])
+
+        assert diff.added == [added_path]
+        assert diff.changed == [changed_path]
+        assert diff.unchanged == [unchanged_path]
+        assert diff.deleted == [deleted_path]
+        assert diff.records[unchanged_path].chunk_ids == ["unchanged.py:0"]
+        assert diff.records[changed_path].chunk_ids == []
+        assert diff.stale_chunk_ids(manifest) == ["changed.py:0", "deleted.py:0", "deleted.py:10"]
+
+    def test_touched_file_is_unchanged(self):
+        file_path = self.write_file("touched.py", "a = 1\n")
+        manifest = Manifest({file_path: FileRecord(0, 0, hash_file(file_path), ["touched.py:0"])})
+
+        diff = manifest.diff([file_path])
+
+        assert diff.unchanged == [file_path]
+        assert diff.records[file_path].chunk_ids == ["touched.py:0"]
+        assert diff.records[file_path].mtime_ns == os.stat(file_path).st_mtime_ns
+
+    def test_save_and_load_round_trip(self):
+        manifest_file = os.path.join(self.tmp_dir.name, "vs.manifest.json")
+        Manifest({"/repo/a.py": FileRecord(10, 20, "abc", ["/repo/a.py:0"])},
+                 {"chunk_size": 1000, "chunk_overlap": 100}).save(manifest_file)
+
+        loaded = Manifest.load(manifest_file)
+
+        assert loaded.settings == {"chunk_size": 1000, "chunk_overlap": 100}
+        assert loaded.records["/repo/a.py"].to_dict() == FileRecord(10, 20, "abc", ["/repo/a.py:0"]).to_dict()
+
+    def test_save_keeps_dirty_paths_of_indexed_files(self):
+        manifest_file = os.path.join(self.tmp_dir.name, "vs.manifest.json")
+        Manifest({"/repo/a.py": FileRecord(10, 20, "abc")}, commit_sha="abc123",
+                 dirty_paths=["/repo/a.py", "/repo/notes.txt"]).save(manifest_file)
+
+        assert Manifest.load(manifest_file).dirty_paths == ["/repo/a.py"]
+
+    def test_load_missing_manifest(self):
+        assert Manifest.load(os.path.join(self.tmp_dir.name, "missing.json")) is None
+
+    def test_diff_changed_only_checks_given_files(self):
+        changed_path = self.write_file("changed.py", "b = 2\n")
+        deleted_path = os.path.join(self.tmp_dir.name, "deleted.py")
+        manifest = Manifest({
+            "/repo/untouched.py": FileRecord(1, 1, "untouched-hash", ["untouched.py:0"]),
+            changed_path: FileRecord(0, 0, "stale-hash", ["changed.py:0"]),
+            deleted_path: FileRecord(1, 1, "deleted-hash", ["deleted.py:0"]),
+        })
+
+        diff = manifest.diff_changed([changed_path], [deleted_path, "/repo/never-indexed.py"])
+
+        assert diff.changed == [changed_path]
+        assert diff.deleted == [deleted_path]
+        assert sorted(diff.records) == sorted(["/repo/untouched.py", changed_path])
+        assert diff.stale_chunk_ids(manifest) == ["changed.py:0", "deleted.py:0"]
+
+    def test_diff_records_compares_hashes_and_chunk_ids(self):
+        manifest = Manifest({
+            "unchanged.py": FileRecord(1, 1, "same-hash", ["unchanged.py:0"]),
+            "rechunked.py": FileRecord(1, 1, "same-hash", ["rechunked.py:0"]),
+            "changed.py": FileRecord(1, 1, "old-hash", ["changed.py:0"]),
+            "deleted.py": FileRecord(1, 1, "deleted-hash", ["deleted.py:0"]),
+        })
+
+        diff = manifest.diff_records({
+            "unchanged.py": FileRecord(2, 2, "same-hash", ["unchanged.py:0"]),
+            "rechunked.py": FileRecord(1, 1, "same-hash", ["rechunked.py:0", "rechunked.py:50"]),
+            "changed.py": FileRecord(1, 1, "new-hash", ["changed.py:0"]),
+            "added.py": FileRecord(1, 1, "added-hash", ["added.py:0"]),
+        })
+
+        assert diff.unchanged == ["unchanged.py"]
+        assert diff.changed == ["rechunked.py", "changed.py"]
+        assert diff.added == ["added.py"]
+        assert diff.deleted == ["deleted.py"]
+        assert diff.records["added.py"].chunk_ids == []
+        assert diff.stale_chunk_ids(manifest) == ["rechunked.py:0", "changed.py:0", "deleted.py:0"]
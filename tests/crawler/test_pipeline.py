@@ -0,0 +1,56 @@
+import unittest
+from repogpt.pipeline import ordered_map, prefetch, process_pool
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def test_ordered_map_serial(self):
+        assert list(ordered_map(square, list(range(10)))) == [x * x for x in range(10)]
+
+    def test_ordered_map_keeps_order_across_workers(self):
+        results = list(ordered_map(square, list(range(100)), workers=2, chunksize=3, max_pending=1))
+        assert results == [x * x for x in range(100)]
+
+    def test_ordered_map_shares_pool_across_calls(self):
+        with process_pool(2) as executor:
+            first = list(ordered_map(square, list(range(10)), workers=2, executor=executor))
+            second = list(ordered_map(square, list(range(10, 20)), workers=2, executor=executor))
+        assert first + second == [x * x for x in range(20)]
+
+    def test_process_pool_is_none_when_serial(self):
+        with process_pool(1) as executor:
+            assert executor is None
+
+    def test_prefetch_yields_all_items(self):
+        assert list(prefetch(iter(range(20)), max_pending=3)) == list(range(20))
+
+    def test_prefetch_propagates_errors(self):
+        def failing():
+            yield 1
+            raise RuntimeError("boom")
+
+        items = prefetch(failing())
+        assert next(items) == 1
+        with self.assertRaises(RuntimeError):
+            next(items)
+
+    def test_prefetch_closes_producer_when_consumer_stops(self):
+        closed = []
+
+        def endless():
+            try:
+                n = 0
+                while True:
+                    yield n
+                    n += 1
+            finally:
+                closed.append(True)
+
+        items = prefetch(endless())
+        assert next(items) == 0
+        items.close()
+        assert closed == [True]
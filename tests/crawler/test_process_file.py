@@ -1,5 +1,8 @@
 import unittest
-from repogpt.crawler import process_file, contains_hidden_dir
+from repogpt.crawler import init_crawl_worker, process_file, contains_hidden_dir
+from repogpt.chunk_settings import ChunkSettings
+from repogpt.tokens import count_tokens, get_tokenizer
+from repogpt.chunk_context import render_chunk
 from langchain.docstore.document import Document
 
 
@@ -15,7 +18,7 @@ hello_world()
         """
 
         docs = process_file([Document(page_content=PYTHON_CODE)], "/my/file/path/", "hello.py",
-                            ".py", 100, 0)
+                            ".py", ChunkSettings(100, 0, embed_header="full"))
 
         expected_docs = [Document(page_content='The following code snippet is from a file at location '
                                                '/my/file/path/hello.py starting at line 2 and ending at line 6.   '
@@ -23,9 +26,45 @@ hello_world()
                                                'line 2 and ending at line 3. The code snippet starting at line 2 and '
                                                'ending at line 6 is \n ```\ndef hello_world():\n    '
                                                'print("Hello, World!")\n\n# Call the function\nhello_world()\n``` ',
-                                  metadata={'start_index': 1, 'starting_line': 2, 'ending_line': 6}),]
+                                  metadata={'start_index': 1, 'end_index': 81, 'starting_line': 2,
+                                            'ending_line': 6, 'context': {'classes': [],
+                                                                          'methods': [['hello_world', 2, 3]]},
+                                            'code_start': 286, 'code_end': 366}),]
         assert expected_docs == docs
 
+    def test_characters_do_not_need_the_tokenizer(self):
+        get_tokenizer.cache_clear()
+        init_crawl_worker([".py"], ChunkSettings(100, 0))
+        docs = process_file([Document(page_content="def hello_world():\n    pass\n")], "/my/file/path/", "hello.py",
+                            ".py", ChunkSettings(100, 0))
+
+        assert 'num_tokens' not in docs[0].metadata
+        assert get_tokenizer.cache_info().currsize == 0
+
+    def test_tokens_of_the_prompt_text_are_counted_in_token_unit(self):
+        docs = process_file([Document(page_content="def hello_world():\n    pass\n", metadata={'source': 'hello.py'})],
+                            "/my/file/path/", "hello.py", ".py", ChunkSettings(100, 0, chunk_unit="tokens"))
+
+        prompt_text = render_chunk(docs[0].page_content, docs[0].metadata)
+        assert docs[0].metadata['num_tokens'] == count_tokens(prompt_text) > count_tokens(docs[0].page_content)
+
+    def test_process_file_short_header(self):
+        docs = process_file([Document(page_content="def hello_world():\n    pass\n", metadata={'source': 'hello.py'})],
+                            "/my/file/path/", "hello.py", ".py", ChunkSettings(100, 0))
+
+        assert docs[0].page_content == '/my/file/path/hello.py lines 1-2 (hello_world)\ndef hello_world():\n    pass'
+        assert render_chunk(docs[0].page_content, docs[0].metadata) == \
+               'The following code snippet is from a file at location hello.py starting at line 1 and ending at ' \
+               'line 2.   The method defined in this snippet is called `hello_world` starting at line 1 and ending ' \
+               'at line 2. The code snippet starting at line 1 and ending at line 2 is \n ```\ndef hello_world():\n' \
+               '    pass\n``` '
+
+    def test_unknown_chunk_settings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ChunkSettings(100, 0, chunk_unit="lines")
+        with self.assertRaises(ValueError):
+            ChunkSettings(100, 0, chunking="paragraph")
+
     def test_contains_hidden_dir_is_hidden(self):
         test_contains = contains_hidden_dir("/my/test/.hidden/dir")
         assert test_contains
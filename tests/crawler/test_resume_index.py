@@ -0,0 +1,117 @@
+import unittest
+import tempfile
+import os
+from typing import List
+from unittest import mock
+from repogpt import crawler
+from repogpt.chunk_batch import ChunkBatch
+from repogpt.crawler import batch_files, file_properties_from_path, plan_index, run_index
+from repogpt.embedding_scheduler import EmbeddingScheduler
+from repogpt.manifest import FileRecord, Manifest, manifest_path
+
+SETTINGS = {"chunk_size": 3000, "chunk_overlap": 0}
+
+
+class ListDeepLake:
+    """Vector store keeping the ids of its rows in a list per dataset. Like DeepLake, adding an id twice adds two
+    rows"""
+    datasets = {}
+
+    def __init__(self, dataset_path: str, embedding=None, overwrite: bool = False):
+        if overwrite or dataset_path not in ListDeepLake.datasets:
+            ListDeepLake.datasets[dataset_path] = []
+        os.makedirs(dataset_path, exist_ok=True)
+        self.rows = ListDeepLake.datasets[dataset_path]
+        self.vectorstore = self
+
+    def add(self, text: List[str], metadata: List[dict], embedding: List[List[float]], id: List[str]):
+        self.rows.extend(id)
+
+    def delete(self, ids: List[str]):
+        self.rows[:] = [row for row in self.rows if row not in set(ids)]
+
+
+class ZeroEmbeddings:
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[0.0] for _ in texts]
+
+
+class ModelEmbeddings(ZeroEmbeddings):
+
+    def __init__(self, model: str):
+        self.model = model
+
+
+class Crash(Exception):
+    pass
+
+
+class ResumeIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.vs_path = os.path.join(self.tmp_dir.name, "vs")
+        patcher = mock.patch.object(crawler, "DeepLake", ListDeepLake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.file_paths = [os.path.join(self.tmp_dir.name, f"{name}.py") for name in "abc"]
+        self.records = {file_path: FileRecord(1, 1, f"{file_path}-hash") for file_path in self.file_paths}
+        self.scheduler = EmbeddingScheduler(ZeroEmbeddings())
+
+    def diff_files(self, old_manifest: Manifest, rebuild: bool):
+        return old_manifest.diff_records(self.records)
+
+    @staticmethod
+    def file_batches(files_to_index: List[str]):
+        """One batch per file, each with two chunks"""
+        for file_path in files_to_index:
+            chunks = ChunkBatch()
+            for start_index in (0, 100):
+                chunks.append("code", {"source": file_path, "start_index": start_index})
+            yield [(file_properties_from_path(file_path), chunks)]
+
+    def index(self, resume: bool = False, crash_on: str = None, embeddings=None) -> List[str]:
+        vs, checkpoint, records, files_to_index = plan_index(self.vs_path, embeddings, SETTINGS, self.diff_files,
+                                                             "abc123", resume)
+        if crash_on is not None:
+            commit = checkpoint.commit
+
+            def crash_before_commit(batch_records):
+                # the chunks of the batch are already in the store
+                if crash_on in batch_records:
+                    raise Crash()
+                commit(batch_records)
+            checkpoint.commit = crash_before_commit
+
+        run_index(vs, self.vs_path, embeddings, checkpoint, records,
+                  batch_files(self.file_batches(files_to_index), records), self.scheduler)
+        return files_to_index
+
+    def expected_rows(self) -> List[str]:
+        return [f"{file_path}:{start_index}" for file_path in self.file_paths for start_index in (0, 100)]
+
+    def test_resume_after_crash_between_add_and_commit(self):
+        with self.assertRaises(Crash):
+            self.index(crash_on=self.file_paths[1])
+
+        self.index(resume=True)
+
+        assert ListDeepLake.datasets[self.vs_path] == self.expected_rows()
+
+    def test_rerun_after_crash_between_add_and_commit(self):
+        with self.assertRaises(Crash):
+            self.index(crash_on=self.file_paths[1])
+
+        self.index()
+
+        assert sorted(ListDeepLake.datasets[self.vs_path]) == sorted(self.expected_rows())
+
+    def test_switching_embedding_model_rebuilds_the_index(self):
+        self.index(embeddings=ModelEmbeddings("model-a"))
+
+        assert sorted(self.index(embeddings=ModelEmbeddings("model-b"))) == sorted(self.file_paths)
+        assert sorted(ListDeepLake.datasets[self.vs_path]) == sorted(self.expected_rows())
+        assert Manifest.load(manifest_path(self.vs_path)).settings["embedding_model"] == "ModelEmbeddings:model-b"
@@ -0,0 +1,66 @@
+import unittest
+import tempfile
+import pickle
+import json
+import os
+from repogpt.run_report import RunReport
+
+
+class RunReportTestCase(unittest.TestCase):
+
+    def test_stage_accumulates_calls_and_counts(self):
+        run_report = RunReport()
+        for num_chunks in [2, 3]:
+            with run_report.stage("split") as stats:
+                stats.files = 1
+                stats.chunks = num_chunks
+
+        split_stats = run_report.stages["split"]
+        assert split_stats.calls == 2
+        assert split_stats.files == 2
+        assert split_stats.chunks == 5
+        assert split_stats.wall_seconds >= 0
+
+    def test_stage_is_recorded_when_it_raises(self):
+        run_report = RunReport()
+        with self.assertRaises(ValueError):
+            with run_report.stage("parse"):
+                raise ValueError("bad file")
+        assert run_report.stages["parse"].calls == 1
+
+    def test_keeps_top_n_slowest_files(self):
+        run_report = RunReport(top_n=2)
+        for seconds, path in [(0.1, "a.py"), (0.5, "b.py"), (0.3, "c.py"), (0.2, "d.py")]:
+            run_report.record_file(path, seconds)
+
+        slowest_files = run_report.to_dict()["slowest_files"]
+
+        assert [file["path"] for file in slowest_files] == ["b.py", "c.py"]
+
+    def test_merge_worker_report(self):
+        worker_report = pickle.loads(pickle.dumps(RunReport()))
+        with worker_report.stage("read") as stats:
+            stats.bytes = 100
+        worker_report.parsers["python"] = "PythonParser"
+
+        run_report = RunReport()
+        run_report.merge(worker_report)
+        run_report.merge(worker_report)
+
+        assert run_report.stages["read"].calls == 2
+        assert run_report.stages["read"].bytes == 200
+        assert run_report.parsers == {"python": "PythonParser"}
+
+    def test_save_writes_json(self):
+        run_report = RunReport()
+        with run_report.stage("walk") as stats:
+            stats.files = 3
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "report.json")
+            run_report.save(report_path)
+            with open(report_path) as f:
+                contents = json.load(f)
+
+        assert contents["stages"]["walk"]["files"] == 3
+        assert contents["parsers"] == {}
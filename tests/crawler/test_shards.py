@@ -0,0 +1,48 @@
+import unittest
+import tempfile
+import os
+from repogpt.shards import ROOT_SHARD, ShardLayout, shard_layout_path
+
+
+class ShardLayoutTestCase(unittest.TestCase):
+
+    def test_directory_shards_by_top_level_directory(self):
+        layout = ShardLayout("directory")
+
+        assert layout.shard_of("services/api/main.py") == "services"
+        assert layout.shard_of("lib/util.go") == "lib"
+        assert layout.shard_of("setup.py") == ROOT_SHARD
+
+    def test_hash_shards_are_stable_and_in_range(self):
+        layout = ShardLayout("hash", num_shards=4)
+        paths = [f"pkg{i}/module{i}.py" for i in range(100)]
+
+        shards = [layout.shard_of(path) for path in paths]
+
+        assert shards == [ShardLayout("hash", num_shards=4).shard_of(path) for path in paths]
+        assert set(shards) <= {"000", "001", "002", "003"}
+        assert len(set(shards)) > 1
+
+    def test_group_leaves_out_empty_shards(self):
+        layout = ShardLayout("directory")
+        root_dir = "repo"
+
+        groups = layout.group(root_dir, [os.path.join(root_dir, "b", "x.py"), os.path.join(root_dir, "a", "y.py"),
+                                         os.path.join(root_dir, "b", "z.py")])
+
+        assert list(groups) == ["a", "b"]
+        assert groups["b"] == [os.path.join(root_dir, "b", "x.py"), os.path.join(root_dir, "b", "z.py")]
+
+    def test_layout_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = shard_layout_path(os.path.join(tmp_dir, "vs"))
+            assert ShardLayout.load(path) is None
+
+            ShardLayout("hash", 3, ["000", "002"]).save(path)
+            layout = ShardLayout.load(path)
+
+        assert (layout.shard_by, layout.num_shards, layout.shards) == ("hash", 3, ["000", "002"])
+
+    def test_unknown_shard_mode_raises(self):
+        with self.assertRaises(ValueError):
+            ShardLayout("none")
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from repogpt.parsers.python_parser import PythonParser
+from repogpt.parsers.treesitter import FileSummary
+from repogpt.summary_cache import SummaryCache, decode_summary, encode_summary, get_summary_cache, hash_code
+
+
+class CountingParser(PythonParser):
+    parsed = []
+
+    @staticmethod
+    def get_file_summary(code: str, file_name: str) -> FileSummary:
+        CountingParser.parsed.append(file_name)
+        return PythonParser.get_file_summary(code, file_name)
+
+
+def put_summary(cache_dir: str, code: str) -> bool:
+    """Write a summary through the cache of a worker, returns whether the worker used a connection of its own"""
+    cache = get_summary_cache(cache_dir, 16)
+    cache.put("parser", hash_code(code), FileSummary())
+    return cache.store.pid == os.getpid()
+
+
+def positions(file_summary: FileSummary):
+    return ([(c.name, c.start_line, c.end_line) for c in file_summary.classes],
+            [(m.name, m.start_line, m.end_line) for m in file_summary.methods])
+
+
+class SummaryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        CountingParser.parsed = []
+
+    def test_encoding_round_trips(self):
+        file_summary = FileSummary()
+        file_summary.add_class("Größe", 1, 20)
+        file_summary.add_method("area", 3, 5)
+        file_summary.add_method("open_ended", 7)
+
+        assert positions(decode_summary(encode_summary(file_summary))) == positions(file_summary)
+
+    def test_unchanged_files_are_not_parsed_again(self):
+        code = "class A:\n    def f(self):\n        return 1\n"
+
+        first = SummaryCache(self.tmp_dir.name).get_file_summary(CountingParser, code, "a.py")
+        # a new cache over the same directory sees the summaries of the previous crawl
+        second = SummaryCache(self.tmp_dir.name).get_file_summary(CountingParser, code, "b.py")
+        SummaryCache(self.tmp_dir.name).get_file_summary(CountingParser, code + "\n", "c.py")
+
+        assert positions(first) == positions(second) == ([("A", 1, 3)], [("f", 2, 3)])
+        assert CountingParser.parsed == ["a.py", "c.py"]
+
+    def test_parser_versions_do_not_share_summaries(self):
+        cache = SummaryCache(self.tmp_dir.name)
+        cache.put("parser:1", hash_code("code"), FileSummary())
+
+        assert cache.get("parser:1", hash_code("code")) is not None
+        assert cache.get("parser:2", hash_code("code")) is None
+
+    def test_least_recently_used_summaries_are_evicted(self):
+        cache = SummaryCache(self.tmp_dir.name, max_size_mb=0)
+        cache.store.max_size = 60
+        file_summary = FileSummary()
+        file_summary.add_class("A" * 10, 1, 2)
+
+        for code in ("one", "two", "three"):
+            cache.put("parser", hash_code(code), file_summary)
+
+        assert cache.get("parser", hash_code("one")) is None
+        assert cache.get("parser", hash_code("three")) is not None
+
+    def test_unpickling_reopens_one_cache_per_process(self):
+        cache = get_summary_cache(self.tmp_dir.name, 16)
+
+        assert pickle.loads(pickle.dumps(cache)) is cache
+
+    def test_forked_workers_write_through_their_own_connection(self):
+        cache = get_summary_cache(self.tmp_dir.name, 16)
+        cache.put("parser", hash_code("parent"), FileSummary())
+        codes = [f"code {i}" for i in range(8)]
+
+        with ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("fork")) as executor:
+            own_connections = list(executor.map(put_summary, [self.tmp_dir.name] * len(codes), codes))
+
+        assert all(own_connections)
+        assert all(cache.get("parser", hash_code(code)) is not None for code in codes + ["parent"])
@@ -0,0 +1,64 @@
+import unittest
+from langchain.docstore.document import Document
+from langchain.text_splitter import Language, RecursiveCharacterTextSplitter
+from repogpt.parsers.python_parser import PythonParser
+from repogpt.parsers.treesitter import FileSummary
+from repogpt.syntax_splitter import definition_starts, split_on_definitions
+
+PYTHON_CODE = """import os
+
+
+def small_one():
+    return 1
+
+
+def small_two():
+    return 2
+
+
+class Big:
+    def method(self):
+        return [
+            "a long line that makes this class larger than the chunk size",
+            "another long line that makes this class larger than the chunk size",
+        ]
+"""
+
+
+class SyntaxSplitterTestCase(unittest.TestCase):
+
+    def split(self, code: str, chunk_size: int):
+        splitter = RecursiveCharacterTextSplitter.from_language(Language.PYTHON, chunk_size=chunk_size,
+                                                                chunk_overlap=0, add_start_index=True)
+        file_summary = PythonParser.get_file_summary(code, "test.py")
+        return split_on_definitions(Document(page_content=code, metadata={'source': 'test.py'}), file_summary,
+                                    splitter, chunk_size, PythonParser.first_line)
+
+    def test_definition_starts_skips_nested_definitions(self):
+        file_summary = FileSummary()
+        file_summary.add_class("Big", 11, 17)
+        file_summary.add_method("method", 12, 17)
+        file_summary.add_method("small_one", 3, 4)
+
+        assert definition_starts(file_summary, first_line=0) == [4, 12]
+
+    def test_small_definitions_are_packed(self):
+        docs = self.split(PYTHON_CODE, 80)
+
+        assert docs[0].page_content == 'import os\n\n\ndef small_one():\n    return 1\n\n\ndef small_two():\n    return 2'
+        assert docs[0].metadata == {'source': 'test.py', 'start_index': 0}
+
+    def test_only_oversized_definitions_are_split(self):
+        docs = self.split(PYTHON_CODE, 80)
+
+        assert len(docs) > 2
+        assert all(doc.page_content in PYTHON_CODE for doc in docs)
+        assert all(PYTHON_CODE[doc.metadata['start_index']:].startswith(doc.page_content) for doc in docs)
+        assert docs[1].page_content.startswith("class Big:")
+
+    def test_decorators_stay_with_their_definition(self):
+        code = "x = 1\n\n\n@property\ndef value():\n    return 1\n"
+
+        docs = self.split(code, 40)
+
+        assert [doc.page_content for doc in docs] == ["x = 1", "@property\ndef value():\n    return 1"]
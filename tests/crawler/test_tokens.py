@@ -0,0 +1,28 @@
+import unittest
+from repogpt.tokens import MAX_MEMOIZED_LENGTH, count_short_tokens, count_tokens, get_tokenizer
+
+
+class TokensTestCase(unittest.TestCase):
+
+    def test_count_tokens(self):
+        assert count_tokens("hello world") == 2
+        assert count_tokens("") == 0
+
+    def test_special_tokens_are_counted_as_text(self):
+        assert count_tokens("<|endoftext|>") > 1
+
+    def test_tokenizer_is_loaded_once(self):
+        assert get_tokenizer() is get_tokenizer()
+
+    def test_counts_of_short_texts_are_memoized(self):
+        count_short_tokens.cache_clear()
+        count_tokens("def hello_world():")
+        count_tokens("def hello_world():")
+        assert count_short_tokens.cache_info().hits == 1
+
+    def test_counts_of_long_texts_are_not_memoized(self):
+        count_short_tokens.cache_clear()
+        long_text = "x = 1\n" * MAX_MEMOIZED_LENGTH
+
+        assert count_tokens(long_text) == count_tokens(long_text) > 0
+        assert count_short_tokens.cache_info().currsize == 0
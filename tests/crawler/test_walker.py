@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import os
+from repogpt.walker import CrawlReport, IgnoreMatcher, IgnorePattern, walk_repo
+
+
+class IgnorePatternTestCase(unittest.TestCase):
+
+    def assert_matches(self, pattern: str, rel_path: str, is_dir: bool = False, expected: bool = True):
+        name = rel_path.rsplit('/', 1)[-1]
+        assert IgnorePattern.parse(pattern).matches(rel_path, name, is_dir) == expected, (pattern, rel_path)
+
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        self.assert_matches("*.min.js", "app.min.js")
+        self.assert_matches("*.min.js", "static/js/app.min.js")
+        self.assert_matches("*.min.js", "static/js/app.js", expected=False)
+
+    def test_anchored_pattern_is_relative_to_root(self):
+        self.assert_matches("/build", "build", is_dir=True)
+        self.assert_matches("/build", "src/build", is_dir=True, expected=False)
+        self.assert_matches("docs/*.md", "docs/index.md")
+        self.assert_matches("docs/*.md", "docs/api/index.md", expected=False)
+
+    def test_double_star(self):
+        self.assert_matches("**/generated", "a/b/generated", is_dir=True)
+        self.assert_matches("**/generated", "generated", is_dir=True)
+        self.assert_matches("vendor/**", "vendor/lib/x.go")
+        self.assert_matches("a/**/z.py", "a/z.py")
+        self.assert_matches("a/**/z.py", "a/b/c/z.py")
+
+    def test_dir_only_pattern(self):
+        self.assert_matches("target/", "target", is_dir=True)
+        self.assert_matches("target/", "target", is_dir=False, expected=False)
+
+    def test_comments_and_blank_lines(self):
+        assert IgnorePattern.parse("# comment") is None
+        assert IgnorePattern.parse("   ") is None
+        assert IgnorePattern.parse("\\#file").matches("#file", "#file", False)
+
+
+class WalkRepoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.root = self.tmp_dir.name
+
+    def write_file(self, rel_path: str, contents: str = ""):
+        file_path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(contents)
+
+    def test_walk_repo_prunes_ignored_and_hidden_dirs(self):
+        self.write_file(".git/HEAD")
+        self.write_file(".git/info/exclude", "secret.py\n")
+        self.write_file(".gitignore", "node_modules/\n*.log\n!keep.log\n")
+        self.write_file("main.py")
+        self.write_file("secret.py")
+        self.write_file("debug.log")
+        self.write_file("keep.log")
+        self.write_file("node_modules/lib/index.js")
+        self.write_file("src/.gitignore", "/local.py\n")
+        self.write_file("src/local.py")
+        self.write_file("src/app.py")
+        self.write_file("src/nested/local.py")
+        self.write_file("build/out.js")
+
+        report = CrawlReport()
+        walked = [os.path.relpath(os.path.join(dir_path, file), self.root)
+                  for dir_path, file in walk_repo(self.root, ["build/"], report)]
+
+        assert walked == ["keep.log", "main.py", "src/app.py", "src/nested/local.py"]
+        # .git, node_modules and build
+        assert report.skipped["ignored directories"] == 3
+        assert report.skipped["ignored files"] == 5
+
+    def test_is_path_ignored_checks_parent_dirs(self):
+        self.write_file(".gitignore", "generated/\n")
+        matcher = IgnoreMatcher(self.root, ["*.pb.go"])
+
+        assert matcher.is_path_ignored("generated/sub/file.py")
+        assert matcher.is_path_ignored("api/service.pb.go")
+        assert matcher.is_path_ignored(".github/workflows/ci.py")
+        assert not matcher.is_path_ignored("src/file.py")
@@ -0,0 +1,42 @@
+import unittest
+import tempfile
+import json
+import os
+from repogpt.parsers.grammars import GRAMMAR_BUNDLE_VERSION, GrammarBundle, bundle_target
+
+
+class GrammarBundleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_manifest(self, **fields):
+        manifest = {"version": GRAMMAR_BUNDLE_VERSION, **bundle_target(),
+                    "languages": {"java": {"library": "java.so", "symbol": "java"}}}
+        manifest.update(fields)
+        with open(os.path.join(self.tmp_dir.name, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+    def test_open_returns_none_without_bundle(self):
+        assert GrammarBundle.open(self.tmp_dir.name) is None
+
+    def test_open_only_reads_manifest(self):
+        self.write_manifest()
+
+        bundle = GrammarBundle.open(self.tmp_dir.name)
+
+        assert list(bundle.libraries) == ["java"]
+        assert bundle.languages == {}
+
+    def test_open_rejects_bundle_built_for_another_tree_sitter(self):
+        self.write_manifest(tree_sitter="0.0.1")
+
+        with self.assertRaises(ValueError):
+            GrammarBundle.open(self.tmp_dir.name)
+
+    def test_unknown_language_raises(self):
+        self.write_manifest()
+
+        with self.assertRaises(ValueError):
+            GrammarBundle.open(self.tmp_dir.name).language("cobol")
@@ -3,6 +3,8 @@ from repogpt.parsers.java_treesitter_parser import JavaTreeSitterParser
 from repogpt.parsers.cpp_treesitter_parser import CppTreeSitterParser
 from repogpt.parsers.go_treesitter_parser import GoTreeSitterParser
 from repogpt.parsers.js_treesitter_parser import JsTreeSitterParser
+from repogpt.parsers.treesitter import QUERIES_DIR, TreeSitterParser
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 
@@ -96,3 +98,25 @@ class TreeSitterParserTest(unittest.TestCase):
         expected_classes = [('Person', 7, 11), ('Shape', 18, 20), ('Employee', 23, 26)]
 
         assert actual_methods == expected_methods and actual_classes == expected_classes
+
+    def test_parsers_are_reused_per_thread(self):
+        parser = TreeSitterParser.get_parser('java')
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other_thread_parser = executor.submit(TreeSitterParser.get_parser, 'java').result()
+
+        assert TreeSitterParser.get_parser('java') is parser
+        assert other_thread_parser is not parser
+
+    def test_treesitter_parser_deeply_nested_file(self):
+        # deeper than the recursion limit, as found in generated code
+        code = "class Deep { void nested() { " + "{" * 5000 + "}" * 5000 + " } }"
+
+        fs = JavaTreeSitterParser.get_file_summary(code, "test.java")
+
+        assert [(m.name, m.start_line, m.end_line) for m in fs.methods] == [('nested', 0, 0)]
+        assert [(c.name, c.start_line, c.end_line) for c in fs.classes] == [('Deep', 0, 0)]
+
+    def test_every_treesitter_parser_has_a_query(self):
+        for parser in (JavaTreeSitterParser, CppTreeSitterParser, GoTreeSitterParser, JsTreeSitterParser):
+            assert os.path.exists(os.path.join(QUERIES_DIR, f"{parser.grammar}.scm"))